@@ -0,0 +1,55 @@
+"""
+Benchmark the JSON codec against the `json` module of the standard library,
+using large outputs like produced by `explore dashboards --data-details` or `find`.
+
+Synopsis::
+
+    pip install orjson
+    python benchmarks/codec.py
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import mkdashboards  # noqa: E402
+
+from grafana_wtf import codec  # noqa: E402
+
+
+def timeit(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run(dashboards: int, panels: int):
+    data = mkdashboards(dashboards, panels=panels, datasources=10)
+
+    stdlib_output, text = timeit(json.dumps, data, indent=4)
+    codec_output, _ = timeit(codec.json_dumps, data, indent=4)
+
+    stdlib_compact, _ = timeit(
+        json.dumps, data, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+    codec_compact, _ = timeit(codec.json_dumps_compact, data, sort_keys=True)
+
+    stdlib_loads, _ = timeit(json.loads, text)
+    codec_loads, _ = timeit(codec.json_loads, text)
+
+    print(  # noqa: T201
+        f"dashboards={dashboards:>5} panels={panels:>4} size={len(text) / 2**20:7.2f} MiB  "
+        f"output={stdlib_output:6.3f}s/{codec_output:6.3f}s  "
+        f"compact={stdlib_compact:6.3f}s/{codec_compact:6.3f}s  "
+        f"loads={stdlib_loads:6.3f}s/{codec_loads:6.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    backend = "orjson" if codec.orjson is not None else "json (orjson not installed)"
+    print(f"Timings: json/{backend}")  # noqa: T201
+    for count in [100, 1000, 5000]:
+        run(dashboards=count, panels=20)
@@ -0,0 +1,48 @@
+"""
+Benchmark the `Indexer` and `DashboardDataDetails` with synthetic many-panel dashboards.
+
+Synopsis::
+
+    python benchmarks/indexer.py
+"""
+
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import mkdashboards, mkdatasources  # noqa: E402
+
+from grafana_wtf.core import Indexer  # noqa: E402
+from grafana_wtf.model import DashboardDataDetails, DashboardDetails  # noqa: E402
+
+
+def run(panels: int, datasources: int, dashboards: int = 10):
+    dashboard_items = mkdashboards(dashboards, panels=panels, datasources=datasources)
+    datasource_items = mkdatasources(datasources)
+    engine = Mock(
+        scan_dashboards=Mock(return_value=dashboard_items),
+        scan_datasources=Mock(return_value=datasource_items),
+        dashboard_details=lambda: map(DashboardDetails, dashboard_items),
+    )
+
+    start = time.perf_counter()
+    Indexer(engine=engine)
+    duration_index = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for dashboard in dashboard_items:
+        DashboardDataDetails.from_dashboard_details(DashboardDetails(dashboard))
+    duration_details = time.perf_counter() - start
+
+    print(  # noqa: T201
+        f"panels={panels:>5} datasources={datasources:>5}  "
+        f"index={duration_index:8.3f}s  data-details={duration_details:8.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    for size in [100, 200, 400, 800, 1600]:
+        run(panels=size, datasources=size)
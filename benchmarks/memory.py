@@ -0,0 +1,66 @@
+"""
+Benchmark memory usage of dashboards kept in munchified and in compact representation,
+and the time needed for loading them from the document cache and accessing a single field.
+
+Synopsis::
+
+    python benchmarks/memory.py
+"""
+
+import gc
+import json
+import pickle
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from munch import munchify
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import mkdashboards  # noqa: E402
+
+from grafana_wtf.model import CompactDashboard  # noqa: E402
+
+
+def measure(factory, responses):
+    gc.collect()
+    tracemalloc.start()
+    items = [factory(response) for response in responses]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current
+
+
+def load(items):
+    # Load dashboards like from the document cache, and access a single field.
+    blobs = [pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL) for item in items]
+    start = time.perf_counter()
+    for blob in blobs:
+        pickle.loads(blob)["dashboard"]["title"]  # noqa: S301
+    return time.perf_counter() - start
+
+
+def run(dashboards: int, panels: int):
+    # Use plain dictionaries, like decoded from API responses.
+    responses = json.loads(json.dumps(mkdashboards(dashboards, panels=panels, datasources=10)))
+
+    munch_size = measure(munchify, responses)
+    compact_size = measure(CompactDashboard.from_response, responses)
+
+    munch_load = load(map(munchify, responses))
+    compact_load = load(map(CompactDashboard.from_response, responses))
+
+    print(  # noqa: T201
+        f"dashboards={dashboards:>6} panels={panels:>4}  "
+        f"munch={munch_size / 2**20:8.2f} MiB  compact={compact_size / 2**20:8.2f} MiB  "
+        f"ratio={munch_size / compact_size:5.1f}x  "
+        f"load-munch={munch_load:6.3f}s  load-compact={compact_load:6.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    for count in [1000, 2000, 4000]:
+        run(dashboards=count, panels=10)
@@ -0,0 +1,70 @@
+"""
+Synthetic Grafana entities for benchmarking grafana-wtf.
+"""
+
+from munch import munchify
+
+
+def mkdatasources(count: int):
+    return munchify(
+        [
+            {
+                "id": index,
+                "uid": f"ds-{index}",
+                "name": f"datasource-{index}",
+                "type": "influxdb",
+                "url": "http://localhost:8086/",
+            }
+            for index in range(count)
+        ]
+    )
+
+
+def mkdashboard(uid: str, panels: int, datasources: int):
+    """
+    Build dashboard with many panels, each referencing one of the data sources.
+    """
+    return munchify(
+        {
+            "meta": {
+                "isFolder": False,
+                "url": f"/d/{uid}/{uid}",
+                "slug": uid,
+                "folderTitle": "General",
+                "created": "2024-01-01T00:00:00Z",
+                "updated": "2024-01-02T00:00:00Z",
+                "createdBy": "admin",
+                "updatedBy": "admin",
+                "version": 1,
+            },
+            "dashboard": {
+                "uid": uid,
+                "id": 1,
+                "title": f"Dashboard {uid}",
+                "version": 1,
+                "panels": [
+                    {
+                        "id": index,
+                        "title": f"Panel {index}",
+                        "type": "timeseries",
+                        "datasource": {"uid": f"ds-{index % datasources}", "type": "influxdb"},
+                        "targets": [
+                            {
+                                "refId": "A",
+                                "datasource": {"uid": f"ds-{index % datasources}"},
+                                # Query text of a synthetic dashboard, never executed.
+                                "query": f"SELECT mean(value) FROM measurement_{index}",  # noqa: S608
+                            }
+                        ],
+                    }
+                    for index in range(panels)
+                ],
+                "annotations": {"list": []},
+                "templating": {"list": []},
+            },
+        }
+    )
+
+
+def mkdashboards(count: int, panels: int, datasources: int):
+    return [mkdashboard(f"dashboard-{index}", panels, datasources) for index in range(count)]
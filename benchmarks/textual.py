@@ -0,0 +1,53 @@
+"""
+Benchmark the textual search report against the search itself, using synthetic
+many-panel dashboards, where each panel has matches.
+
+Synopsis::
+
+    python benchmarks/textual.py
+"""
+
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from munch import Munch  # noqa: E402
+from synthetic import mkdashboards  # noqa: E402
+
+from grafana_wtf.report.textual import TextualSearchReport  # noqa: E402
+from grafana_wtf.util import JsonPathFinder  # noqa: E402
+
+
+def run(panels: int, dashboards: int = 10):
+    dashboard_items = mkdashboards(dashboards, panels=panels, datasources=10)
+    finder = JsonPathFinder()
+
+    start = time.perf_counter()
+    result = Munch(datasources=[], dashboards=[])
+    for dashboard in dashboard_items:
+        matches = finder.find("ds-", dashboard)
+        result.dashboards.append(Munch(meta=Munch(matches=matches), data=dashboard))
+    duration_search = time.perf_counter() - start
+    count = sum(len(item.meta.matches) for item in result.dashboards)
+
+    report = TextualSearchReport("http://localhost:3000")
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        report.display("ds-", result)
+    duration_render = time.perf_counter() - start
+
+    print(  # noqa: T201
+        f"panels={panels:>5} matches={count:>6}  "
+        f"search={duration_search:8.3f}s  render={duration_render:8.3f}s  "
+        f"output={len(output.getvalue()) / 2**20:6.2f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    for size in [100, 200, 400, 800]:
+        run(panels=size)
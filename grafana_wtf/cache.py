@@ -0,0 +1,82 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import quote
+
+log = logging.getLogger(__name__)
+
+
+class DocumentCache:
+    """
+    Persist decoded documents next to the HTTP response cache.
+
+    The HTTP response cache stores raw response bodies, so each run still
+    needs to decode JSON and munchify the result. This cache stores the
+    ready-to-use objects using pickle, one file per document, which are
+    loaded on demand. Expiration follows the same `expire_after` semantics
+    as the HTTP response cache.
+    """
+
+    def __init__(self, path: Path, namespace: str, expire_after: Optional[int] = None):
+        # Use a separate directory per Grafana instance.
+        digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16]  # noqa: S324
+        self.path = Path(path) / digest
+        self.expire_after = expire_after
+
+    @property
+    def enabled(self) -> bool:
+        return self.expire_after != 0
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        filepath = self.get_filepath(kind, key)
+        try:
+            with open(filepath, "rb") as f:
+                expires, value = pickle.load(f)  # noqa: S301
+        except FileNotFoundError:
+            return None
+        except Exception as ex:
+            log.warning(f"Unable to read cached document {filepath}: {ex}")
+            return None
+        if expires is not None and expires < time.time():
+            return None
+        return value
+
+    def set(self, kind: str, key: str, value: Any):
+        if not self.enabled:
+            return
+        # Like with the HTTP response cache, negative values mean "never expire".
+        expires = None
+        if self.expire_after is not None and self.expire_after > 0:
+            expires = time.time() + self.expire_after
+        filepath = self.get_filepath(kind, key)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write atomically, because documents may be fetched concurrently.
+        fd, tmpname = tempfile.mkstemp(dir=filepath.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((expires, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, filepath)
+        except Exception:
+            os.unlink(tmpname)
+            raise
+
+    def delete(self, kind: str, key: str):
+        try:
+            self.get_filepath(kind, key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def get_filepath(self, kind: str, key: str) -> Path:
+        return self.path / kind / f"{quote(str(key), safe='')}.pickle"
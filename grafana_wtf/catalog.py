@@ -0,0 +1,288 @@
+"""
+Catalog of Grafana entities in tabular shape, for querying them per SQL.
+
+Example::
+
+    SELECT datasource_type, COUNT(*) AS panels
+    FROM panels
+    GROUP BY datasource_type
+    ORDER BY panels DESC
+"""
+
+import typing as t
+from collections import OrderedDict
+
+from grafana_wtf.sql import connect, load_records, query
+
+
+class Catalog:
+    """
+    Provide tables about Grafana entities on a private DuckDB connection.
+
+    All tables are created, even when there is no data for them, so queries
+    do not fail because of missing tables.
+    """
+
+    # Table names, and their column names and types.
+    schema = OrderedDict(
+        dashboards=OrderedDict(
+            uid="VARCHAR",
+            id="BIGINT",
+            title="VARCHAR",
+            version="BIGINT",
+            folder_uid="VARCHAR",
+            folder_title="VARCHAR",
+            url="VARCHAR",
+            updated="VARCHAR",
+            tags="JSON",
+        ),
+        panels=OrderedDict(
+            dashboard_uid="VARCHAR",
+            id="BIGINT",
+            parent_id="BIGINT",
+            title="VARCHAR",
+            type="VARCHAR",
+            datasource_uid="VARCHAR",
+            datasource_name="VARCHAR",
+            datasource_type="VARCHAR",
+            library_panel_uid="VARCHAR",
+        ),
+        targets=OrderedDict(
+            dashboard_uid="VARCHAR",
+            panel_id="BIGINT",
+            ref_id="VARCHAR",
+            datasource_uid="VARCHAR",
+            datasource_name="VARCHAR",
+            datasource_type="VARCHAR",
+            query="VARCHAR",
+            target="JSON",
+        ),
+        datasources=OrderedDict(
+            uid="VARCHAR",
+            id="BIGINT",
+            name="VARCHAR",
+            type="VARCHAR",
+            url="VARCHAR",
+            database="VARCHAR",
+            is_default="BOOLEAN",
+        ),
+        dashboard_datasources=OrderedDict(
+            dashboard_uid="VARCHAR",
+            datasource_uid="VARCHAR",
+            datasource_name="VARCHAR",
+            datasource_type="VARCHAR",
+            missing="BOOLEAN",
+        ),
+        folders=OrderedDict(
+            uid="VARCHAR",
+            id="BIGINT",
+            title="VARCHAR",
+            parent_uid="VARCHAR",
+        ),
+        users=OrderedDict(
+            id="BIGINT",
+            login="VARCHAR",
+            name="VARCHAR",
+            email="VARCHAR",
+            is_admin="BOOLEAN",
+        ),
+        matches=OrderedDict(
+            kind="VARCHAR",
+            uid="VARCHAR",
+            title="VARCHAR",
+            path="VARCHAR",
+            value="JSON",
+        ),
+    )
+
+    # Kinds of matches, by kinds of search results.
+    match_kinds = {"datasources": "datasource", "dashboards": "dashboard"}
+
+    # Attributes of targets containing query expressions, in order of precedence.
+    query_attributes = ["expr", "jql", "query", "rawSql", "target"]
+
+    def __init__(self, connection=None):
+        self.connection = connection or connect()
+        self.records = {name: [] for name in self.schema}
+        self.loaded = False
+
+    def add_dashboards(self, dashboards: t.Iterable):
+        from grafana_wtf.model import dashboard_document
+
+        for dashboard in dashboards:
+            dashboard = dashboard_document(dashboard)
+            if dashboard.meta.get("isFolder"):
+                continue
+            content = dashboard.dashboard
+            uid = content.get("uid")
+            self.records["dashboards"].append(
+                dict(
+                    uid=uid,
+                    id=content.get("id"),
+                    title=content.get("title"),
+                    version=content.get("version"),
+                    folder_uid=dashboard.meta.get("folderUid"),
+                    folder_title=dashboard.meta.get("folderTitle"),
+                    url=dashboard.meta.get("url"),
+                    updated=dashboard.meta.get("updated"),
+                    tags=content.get("tags"),
+                )
+            )
+            self.add_panels(uid, content.get("panels"))
+
+    def add_panels(self, dashboard_uid: str, panels: t.List, parent_id: t.Optional[int] = None):
+        for panel in panels or []:
+            panel_id = panel.get("id")
+            datasource = self.datasource_reference(panel.get("datasource"))
+            self.records["panels"].append(
+                dict(
+                    dashboard_uid=dashboard_uid,
+                    id=panel_id,
+                    parent_id=parent_id,
+                    title=panel.get("title"),
+                    type=panel.get("type"),
+                    datasource_uid=datasource.get("uid"),
+                    datasource_name=datasource.get("name"),
+                    datasource_type=datasource.get("type"),
+                    library_panel_uid=(panel.get("libraryPanel") or {}).get("uid"),
+                )
+            )
+            for target in panel.get("targets") or []:
+                # Targets without data source use the data source of the panel.
+                target_datasource = (
+                    self.datasource_reference(target.get("datasource")) or datasource
+                )
+                self.records["targets"].append(
+                    dict(
+                        dashboard_uid=dashboard_uid,
+                        panel_id=panel_id,
+                        ref_id=target.get("refId"),
+                        datasource_uid=target_datasource.get("uid"),
+                        datasource_name=target_datasource.get("name"),
+                        datasource_type=target_datasource.get("type"),
+                        query=self.query_expression(target),
+                        target=target,
+                    )
+                )
+            self.add_panels(dashboard_uid, panel.get("panels"), parent_id=panel_id)
+
+    def add_datasources(self, datasources: t.Iterable):
+        for datasource in datasources or []:
+            self.records["datasources"].append(
+                dict(
+                    uid=datasource.get("uid"),
+                    id=datasource.get("id"),
+                    name=datasource.get("name"),
+                    type=datasource.get("type"),
+                    url=datasource.get("url"),
+                    database=datasource.get("database"),
+                    is_default=datasource.get("isDefault"),
+                )
+            )
+
+    def add_dashboard_datasources(self, dashboard_uid: str, existing: t.List, missing: t.List):
+        """
+        Add data sources used by dashboard, as resolved by the `Indexer`.
+        """
+        for datasources, is_missing in [(existing, False), (missing, True)]:
+            for datasource in datasources:
+                self.records["dashboard_datasources"].append(
+                    dict(
+                        dashboard_uid=dashboard_uid,
+                        datasource_uid=datasource.get("uid"),
+                        datasource_name=datasource.get("name"),
+                        datasource_type=datasource.get("type"),
+                        missing=is_missing,
+                    )
+                )
+
+    def add_folders(self, folders: t.Iterable):
+        for folder in folders or []:
+            self.records["folders"].append(
+                dict(
+                    uid=folder.get("uid"),
+                    id=folder.get("id"),
+                    title=folder.get("title"),
+                    parent_uid=folder.get("parentUid"),
+                )
+            )
+
+    def add_users(self, users: t.Iterable):
+        for user in users or []:
+            self.records["users"].append(
+                dict(
+                    id=user.get("id"),
+                    login=user.get("login"),
+                    name=user.get("name"),
+                    email=user.get("email"),
+                    is_admin=user.get("isAdmin"),
+                )
+            )
+
+    def add_matches(self, results):
+        """
+        Add matches of search results, see `GrafanaWtf.search`.
+        """
+        items = [("datasources", item) for item in results.datasources] + [
+            ("dashboards", item) for item in results.dashboards
+        ]
+        self.records["matches"].extend(self.match_records(items))
+
+    @classmethod
+    def match_records(cls, items: t.Iterable) -> t.Iterator[t.Dict[str, t.Any]]:
+        """
+        Generate one record per match of search results.
+
+        :param items: `(kind, item)` tuples, as generated by `GrafanaWtf.iter_search`.
+        """
+        for kind, item in items:
+            if kind == "dashboards":
+                uid, title = item.data.dashboard.get("uid"), item.data.dashboard.get("title")
+            else:
+                uid, title = item.data.get("uid"), item.data.get("name")
+            for match in item.meta.get("matches") or []:
+                yield dict(
+                    kind=cls.match_kinds[kind],
+                    uid=uid,
+                    title=title,
+                    path=str(match.full_path),
+                    value=match.value,
+                )
+
+    def load(self, prefix: str = ""):
+        """
+        Create all tables, releasing the records collected so far.
+        """
+        for name, columns in self.schema.items():
+            load_records(self.connection, prefix + name, self.records[name], columns=columns)
+            self.records[name] = []
+        self.loaded = True
+
+    def query(self, expression: str) -> t.List[t.Dict[str, t.Any]]:
+        if not self.loaded:
+            self.load()
+        return list(query(self.connection, expression))
+
+    def close(self):
+        self.connection.close()
+
+    @classmethod
+    def query_expression(cls, target: t.Dict) -> t.Optional[str]:
+        for attribute in cls.query_attributes:
+            value = target.get(attribute)
+            if isinstance(value, dict):
+                value = value.get("query")
+            if isinstance(value, str) and value:
+                return value
+        return None
+
+    @staticmethod
+    def datasource_reference(datasource) -> t.Dict[str, str]:
+        """
+        Decode data source reference, by name or by uid and type.
+        """
+        if isinstance(datasource, str):
+            return {"name": datasource}
+        if isinstance(datasource, dict):
+            return {key: datasource[key] for key in ["uid", "type"] if key in datasource}
+        return {}
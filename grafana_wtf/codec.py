@@ -0,0 +1,90 @@
+"""
+JSON codec, using orjson when installed, and the `json` module of the standard library otherwise.
+
+- https://github.com/ijl/orjson
+"""
+
+import json
+import re
+from json.encoder import encode_basestring_ascii
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+
+def json_dumps(data: Any, indent: Optional[int] = None) -> str:
+    """
+    Serialize data into JSON text, for displaying it to humans.
+
+    Like the `json` module does by default, non-ASCII characters are escaped.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            output = orjson.dumps(data, option=option)
+        except TypeError:
+            # For example, integers exceeding 64 bits.
+            pass
+        else:
+            if indent and indent != 2:
+                output = reindent(output, indent)
+            if not output.isascii():
+                return escape_non_ascii(output.decode("utf-8"))
+            return output.decode("utf-8")
+    return json.dumps(data, indent=indent)
+
+
+def json_dumps_compact(data: Any, sort_keys: bool = False) -> str:
+    """
+    Serialize data into compact JSON text, without escaping non-ASCII characters.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(data, option=option).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(data, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":"))
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def escape_non_ascii(text: str) -> str:
+    """
+    Escape non-ASCII characters of JSON text as `\\uXXXX` sequences.
+
+    Non-ASCII characters can only occur within JSON strings, so all of them can be
+    escaped, without decoding the JSON text.
+    """
+    return NON_ASCII.sub(lambda match: encode_basestring_ascii(match.group())[1:-1], text)
+
+
+def reindent(output: bytes, indent: int) -> bytes:
+    """
+    Adjust indentation of JSON text indented by two spaces per level.
+
+    Indentation is adjusted level by level, using plain substring replacements.
+    This is safe, because JSON strings can not contain verbatim line breaks.
+    """
+    level = 0
+    while True:
+        # Lines on this level and deeper, with outer levels already adjusted.
+        prefix = b"\n" + b" " * (indent * level) + b"  "
+        if prefix not in output:
+            break
+        output = output.replace(prefix, b"\n" + b" " * (indent * (level + 1)))
+        level += 1
+    return output
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 # (c) 2019-2023 Andreas Motl <andreas@hiveeyes.org>
 # License: GNU Affero General Public License, Version 3
+import importlib.util
+import itertools
 import logging
 import os
 from functools import partial
@@ -9,14 +11,7 @@ from operator import itemgetter
 from docopt import DocoptExit, docopt
 
 from grafana_wtf import __appname__, __version__
-from grafana_wtf.core import GrafanaWtf
-from grafana_wtf.report.data import DataSearchReport, output_results
-from grafana_wtf.report.tabular import (
-    TabularEditHistoryReport,
-    TabularSearchReport,
-    get_table_format,
-)
-from grafana_wtf.report.textual import TextualSearchReport
+from grafana_wtf.report.columnar import COLUMNAR_FORMATS
 from grafana_wtf.util import (
     configure_http_logging,
     filter_with_sql,
@@ -31,12 +26,16 @@ log = logging.getLogger(__name__)
 def run():
     """
     Usage:
-      grafana-wtf [options] info
-      grafana-wtf [options] explore datasources
-      grafana-wtf [options] explore dashboards [--data-details] [--queries-only]
+      grafana-wtf [options] info [--sql=<sql>]
+      grafana-wtf [options] explore datasources [--sql=<sql>]
+      grafana-wtf [options] explore dashboards [--data-details] [--queries-only] [--sql=<sql>]
       grafana-wtf [options] explore permissions
-      grafana-wtf [options] find [<search-expression>]
-      grafana-wtf [options] replace <search-expression> <replacement> [--dry-run]
+      grafana-wtf [options] find [<search-expression>] [--sql=<sql>]
+      grafana-wtf [options] replace <search-expression> <replacement> [--dry-run] [--scope=<jsonpath>] [--journal=<file>] [--resume]
+      grafana-wtf [options] rollback <journal-file> [--dry-run]
+      grafana-wtf [options] deps [<node>] [--reverse]
+      grafana-wtf [options] sync <database>
+      grafana-wtf [options] sql <database> <expression>
       grafana-wtf [options] log [<dashboard_uid>] [--number=<count>] [--head=<count>] [--tail=<count>] [--reverse] [--sql=<sql>]
       grafana-wtf [options] plugins list [--id=]
       grafana-wtf [options] plugins status [--id=]
@@ -50,11 +49,20 @@ def run():
       --grafana-token=<grafana-token>   Grafana API Key token
       --select-dashboard=<uuid>         Restrict operation to dashboard by UID.
                                         Can be a list of comma-separated dashboard UIDs.
-      --format=<format>                 Output format. One of textual, tabular, json, yaml.
+      --format=<format>                 Output format. One of textual, tabular, json, yaml, ndjson,
+                                        or the columnar formats parquet, arrow.
+      --output=<file>                   Output file, required for columnar formats.
       --cache-ttl=<cache-ttl>           Time-to-live for the request cache in seconds. [default: 3600]
       --drop-cache                      Drop cache before requesting resources
       --concurrency=<concurrency>       Run multiple requests in parallel. [default: 0]
-      --dry-run                         Dry-run mode for the `replace` subcommand.
+      --compact                         Keep dashboards in compact representation, to reduce memory usage.
+      --low-memory                      Process dashboards one by one, without retaining all of them.
+                                        Applies to `find`, `replace`, `explore dashboards`, and `log`.
+      --dry-run                         Dry-run mode for the `replace` and `rollback` subcommands.
+      --scope=<jsonpath>                Restrict the `replace` subcommand to subtrees
+                                        selected by JSONPath expression.
+      --journal=<file>                  Record outcomes of the `replace` subcommand into journal file.
+      --resume                          Skip dashboards completed according to the journal file.
       --verbose                         Enable verbose mode
       --version                         Show version information
       --debug                           Enable debug messages
@@ -94,6 +102,9 @@ def run():
       # Display only dashboards which have missing data sources, along with their names.
       grafana-wtf explore dashboards --format=json | jq '.[] | select(.datasources_missing) | .dashboard + {ds_missing: .datasources_missing[] | [.name]}'
 
+      # Display dashboards with missing data sources one by one, as soon as they are processed.
+      grafana-wtf explore dashboards --format=ndjson | jq -c 'select(.datasources_missing)'
+
       # Display all dashboards which use a specific data source, filtered by data source name.
       grafana-wtf explore dashboards --format=json | jq '.[] | select(.datasources | .[].name=="<datasource_name>")'
 
@@ -131,6 +142,72 @@ def run():
       # Preview the changes beforehand, using the `--dry-run` option.
       grafana-wtf --select-dashboard=_JJ22OZZk replace grafana-worldmap-panel grafana-map-panel --dry-run
 
+      # Replace string only within panel queries.
+      grafana-wtf replace ldi_readings ldi_measurements --scope='$..targets'
+
+      # Record changes into journal file, and resume interrupted runs.
+      grafana-wtf replace ldi_v2 ldi_v3 --journal=replace.jsonl
+      grafana-wtf replace ldi_v2 ldi_v3 --journal=replace.jsonl --resume
+
+      # Roll back changes recorded into journal file.
+      grafana-wtf rollback replace.jsonl
+
+    Analyze dependencies:
+
+      # Display number of nodes and edges of the dependency graph, per type.
+      grafana-wtf deps
+
+      # Display everything a dashboard depends on, like panels, variables and data sources.
+      grafana-wtf deps dashboard:NP0wTOtmk --format=yaml
+
+      # Display everything depending on a data source, before decommissioning it.
+      # Data sources can be addressed by uid or by name.
+      grafana-wtf deps datasource:PDF2762CDFF14A314 --reverse
+      grafana-wtf deps datasource:ldi_v2 --reverse --format=json | jq -r '.[] | select(.kind=="dashboard") | .url'
+
+    Query per SQL:
+
+      # Tables: dashboards, panels, targets, datasources, dashboard_datasources, folders, users, matches.
+      # Display number of panels per data source type.
+      grafana-wtf explore dashboards --format=yaml --sql="
+        SELECT datasource_type, COUNT(*) AS panels
+        FROM panels
+        GROUP BY datasource_type
+        ORDER BY panels DESC
+      "
+
+      # Display dashboards using data sources which do not exist.
+      grafana-wtf explore dashboards --sql="
+        SELECT dashboard_uid, datasource_name FROM dashboard_datasources WHERE missing
+      "
+
+      # Display number of matches per dashboard.
+      grafana-wtf find ldi_readings --sql="
+        SELECT uid, title, COUNT(*) AS matches FROM matches GROUP BY uid, title
+      "
+
+    Export to columnar formats:
+
+      # Write one row per dashboard and data source into Parquet file.
+      grafana-wtf explore dashboards --format=parquet --output=dashboards.parquet
+
+      # Write edit history of all dashboards into Arrow IPC file.
+      grafana-wtf log --format=arrow --output=versions.arrow
+
+    Analyze offline:
+
+      # Synchronize dashboards, panels, targets, data sources, folders, users,
+      # and edit history into a DuckDB database file, incrementally.
+      grafana-wtf sync grafana.duckdb
+
+      # Query the database file, without connecting to Grafana.
+      grafana-wtf sql grafana.duckdb "
+        SELECT instance, datasource_type, COUNT(*) AS targets
+        FROM targets
+        GROUP BY ALL
+        ORDER BY targets DESC
+      "
+
     Display edit history:
 
       # Display 50 most recent changes across all dashboards.
@@ -184,7 +261,12 @@ def run():
     """  # noqa: E501
 
     # Parse command line arguments
-    options = normalize_options(docopt(run.__doc__, version=f"{__appname__} {__version__}"))
+    arguments = docopt(run.__doc__, version=f"{__appname__} {__version__}")
+    options = normalize_options(arguments)
+
+    # The `sql` subcommand and the `--sql` option share the same normalized name.
+    options.sql = arguments["--sql"]
+    options.sql_subcommand = arguments["sql"]
 
     # Setup logging
     debug = options.get("debug")
@@ -218,12 +300,39 @@ def run():
 
     # Compute default output format.
     if not options.format:
-        if options.find or options.replace:
+        if (options.find or options.replace) and options.sql is None:
             options.format = "textual"
         else:
             options.format = "json"
 
     # Sanity checks
+    if (options.sql is not None or options.sql_subcommand) and options.format.startswith(
+        ("tab", "text")
+    ):
+        raise DocoptExit(
+            f"Option --format={options.format} can not be used with SQL queries, "
+            f"only data output is supported."
+        )
+    if options.resume and not options.journal:
+        raise DocoptExit("Option --resume requires option --journal.")
+    check_columnar_options(options)
+
+    # Modules are imported on demand, in order to keep startup time low,
+    # for example when invoking `--help` or `--version`.
+    from grafana_wtf.report.data import output_catalog_query, output_results
+
+    # Query the warehouse offline, without connecting to Grafana.
+    if options.sql_subcommand:
+        from grafana_wtf.warehouse import Warehouse
+
+        warehouse = Warehouse(options.database, read_only=True)
+        try:
+            results = warehouse.query(options.expression)
+        finally:
+            warehouse.close()
+        output_results(options.format, results)
+        return
+
     if grafana_url is None:
         raise DocoptExit(
             'No Grafana URL given. Please use "--grafana-url" option '
@@ -232,54 +341,148 @@ def run():
 
     log.info(f"Grafana location: {grafana_url}")
 
+    from grafana_wtf.core import GrafanaWtf
+
     engine = GrafanaWtf(grafana_url, grafana_token)
 
     engine.enable_cache(expire_after=cache_ttl, drop_cache=options["drop-cache"])
     engine.enable_concurrency(int(options["concurrency"]))
+    if options.compact:
+        engine.enable_compact()
+    if options.low_memory:
+        engine.enable_low_memory()
 
     log.info(f"Grafana version: {engine.version}")
 
-    if options.replace:
-        engine.clear_cache()
-
     output_format = options["format"]
 
     if options.find or options.replace:
+        dashboard_uids = None
+        dashboards = None
         if options.select_dashboard:
             # Restrict scan to list of dashboards.
             dashboard_uids = read_list(options.select_dashboard)
+
+        if engine.low_memory:
+            # Process dashboards one by one, instead of scanning them up front.
+            if not options.select_dashboard:
+                engine.scan_datasources()
+            dashboards = engine.iter_dashboards(dashboard_uids)
+
+        elif options.select_dashboard:
             engine.scan_dashboards(dashboard_uids)
 
         else:
             # Scan everything.
             engine.scan_common()
 
-        result = engine.search(options.search_expression or None)
+        if options.replace and engine.low_memory:
+            # Do not report matches up front, in order to match
+            # and replace each dashboard within a single pass.
+            log.info("Low-memory mode: Skipping report of matches")
+
+        elif output_format in COLUMNAR_FORMATS:
+            # Output one row per match.
+            from grafana_wtf.catalog import Catalog
+            from grafana_wtf.report.columnar import output_table
+
+            items = engine.iter_search(options.search_expression or None, dashboards=dashboards)
+            output_table(output_format, options.output, "matches", Catalog.match_records(items))
+
+        elif output_format == "ndjson" and options.sql is None:
+            # Output search results one by one, as soon as they are matched.
+            from grafana_wtf.report.data import DataSearchReport
+
+            report = DataSearchReport(grafana_url, verbose=options.verbose, format=output_format)
+            report.display_stream(
+                options.search_expression,
+                engine.iter_search(options.search_expression or None, dashboards=dashboards),
+            )
+
+        elif options.sql is not None:
+            result = engine.search(options.search_expression or None, dashboards=dashboards)
+            output_catalog_query(output_format, engine.catalog(search_results=result), options.sql)
 
-        if output_format.startswith("tab"):
-            table_format = get_table_format(output_format)
-            generator = partial(TabularSearchReport, tblfmt=table_format)
-        elif output_format.startswith("text"):
-            generator = TextualSearchReport
         else:
-            generator = partial(DataSearchReport, format=output_format)
+            result = engine.search(options.search_expression or None, dashboards=dashboards)
+            if output_format.startswith("tab"):
+                from grafana_wtf.report.tabular import TabularSearchReport, get_table_format
+
+                table_format = get_table_format(output_format)
+                generator = partial(TabularSearchReport, tblfmt=table_format)
+            elif output_format.startswith("text"):
+                from grafana_wtf.report.textual import TextualSearchReport
+
+                generator = TextualSearchReport
+            else:
+                from grafana_wtf.report.data import DataSearchReport
 
-        report = generator(grafana_url, verbose=options.verbose)
-        report.display(options.search_expression, result)
+                generator = partial(DataSearchReport, format=output_format)
+
+            report = generator(grafana_url, verbose=options.verbose)
+            report.display(options.search_expression, result)
+
+    if options.replace or options.rollback:
+        from grafana_wtf.journal import ReplaceJournal
 
     if options.replace:
-        engine.replace(options.search_expression, options.replacement, dry_run=options.dry_run)
-        engine.clear_cache()
-
-    if options.log:
-        # Sanity checks.
-        if output_format.startswith("tab") and options.sql:
-            raise DocoptExit(
-                f"Options --format={output_format} and --sql can not be used together, "
-                f"only data output is supported."
-            )
+        journal = None
+        if options.journal:
+            journal = ReplaceJournal(options.journal)
+        engine.replace(
+            options.search_expression,
+            options.replacement,
+            dry_run=options.dry_run,
+            scope=options.scope,
+            journal=journal,
+            resume=options.resume,
+            dashboards=dashboards,
+        )
+
+    if options.rollback:
+        engine.rollback(ReplaceJournal(options.journal_file), dry_run=options.dry_run)
+
+    if options.deps:
+        graph = engine.dependency_graph()
+        if options.node:
+            node = graph.resolve(options.node)
+            if node is None:
+                raise DocoptExit(f'Node "{options.node}" not found in dependency graph.')
+            results = graph.traverse(node, reverse=options.reverse)
+        else:
+            results = graph.summary()
+        output_results(output_format, results)
+
+    if options.sync:
+        from grafana_wtf.warehouse import Warehouse
+
+        warehouse = Warehouse(options.database)
+        try:
+            results = warehouse.sync(engine)
+        finally:
+            warehouse.close()
+        output_results(output_format, results)
 
-        entries = engine.log(dashboard_uid=options.dashboard_uid)
+    if options.log and output_format == "ndjson" and not log_options_given(options):
+        # Output entries one by one, as soon as they are acquired, in order of processing.
+        output_results(output_format, engine.iter_log(dashboard_uid=options.dashboard_uid))
+
+    elif options.log and output_format in COLUMNAR_FORMATS and not log_options_given(options):
+        from grafana_wtf.report.columnar import output_table
+
+        entries = engine.iter_log(dashboard_uid=options.dashboard_uid)
+        output_table(output_format, options.output, "versions", entries)
+
+    elif options.log:
+        # Only the most recent entries are needed, unless filtering with SQL.
+        limit = None
+        if options.sql is None:
+            if options.number is not None:
+                limit = int(options.number)
+            elif options.tail is not None:
+                limit = int(options.tail)
+
+        entries = engine.log(dashboard_uid=options.dashboard_uid, limit=limit)
 
         if options.sql is not None:
             log.info(f"Filtering result with SQL expression: {options.sql}")
@@ -306,22 +509,63 @@ def run():
             entries = list(reversed(entries))
 
         if output_format.startswith("tab"):
+            from grafana_wtf.report.tabular import TabularEditHistoryReport
+
             report = TabularEditHistoryReport(data=entries)
             output = report.render(output_format)
             print(output)
+        elif output_format in COLUMNAR_FORMATS:
+            from grafana_wtf.report.columnar import output_table
+
+            output_table(output_format, options.output, "versions", entries)
         else:
             output_results(output_format, entries)
 
-    if options.explore and options.datasources:
+    if options.explore and (options.datasources or options.dashboards) and options.sql is not None:
+        engine.scan_catalog()
+        output_catalog_query(output_format, engine.catalog(), options.sql)
+
+    elif options.explore and options.datasources:
         results = engine.explore_datasources()
 
         unused_count = len(results["unused"])
         if unused_count:
             log.warning(f"Found {unused_count} unused data source(s)")
 
+        if output_format in COLUMNAR_FORMATS:
+            from grafana_wtf.report.columnar import datasource_records, output_table
+
+            output_table(output_format, options.output, "datasources", datasource_records(results))
+        else:
+            if output_format == "ndjson":
+                # One record per data source, unused ones come without `dashboards` attribute.
+                results = itertools.chain(results["used"], results["unused"])
+            output_results(output_format, results)
+
+    elif options.explore and options.dashboards and output_format in COLUMNAR_FORMATS:
+        from grafana_wtf.report.columnar import (
+            dashboard_detail_records,
+            dashboard_records,
+            output_table,
+        )
+
+        results = engine.iter_explore_dashboards(
+            with_data_details=options.data_details, queries_only=options.queries_only
+        )
+        if options.data_details:
+            records = dashboard_detail_records(results)
+            output_table(output_format, options.output, "dashboard_details", records)
+        else:
+            output_table(output_format, options.output, "dashboards", dashboard_records(results))
+
+    elif options.explore and options.dashboards and output_format == "ndjson":
+        # Output results one by one, as soon as each dashboard has been processed.
+        results = engine.iter_explore_dashboards(
+            with_data_details=options.data_details, queries_only=options.queries_only
+        )
         output_results(output_format, results)
 
-    if options.explore and options.dashboards:
+    elif options.explore and options.dashboards:
         results = engine.explore_dashboards(
             with_data_details=options.data_details, queries_only=options.queries_only
         )
@@ -331,7 +575,11 @@ def run():
         results = engine.explore_permissions()
         output_results(output_format, results)
 
-    if options.info:
+    if options.info and options.sql is not None:
+        engine.scan_catalog()
+        output_catalog_query(output_format, engine.catalog(), options.sql)
+
+    elif options.info:
         response = engine.info()
         output_results(output_format, response)
 
@@ -358,3 +606,40 @@ def run():
         else:
             response = engine.channels_list()
         output_results(output_format, response)
+
+
+def log_options_given(options) -> bool:
+    """
+    Whether the edit history needs to be sorted, filtered, or truncated, before output.
+    """
+    return (
+        options.sql is not None
+        or options.number is not None
+        or options.tail is not None
+        or options.head is not None
+        or bool(options.reverse)
+    )
+
+
+def check_columnar_options(options):
+    """
+    Columnar formats are written to files, and only support selected subcommands.
+    """
+    if options.format not in COLUMNAR_FORMATS:
+        if options.output:
+            formats = ", ".join(COLUMNAR_FORMATS)
+            raise DocoptExit(f"Option --output can only be used with columnar formats: {formats}.")
+        return
+    if not options.output:
+        raise DocoptExit(f"Option --format={options.format} requires option --output.")
+    explore = options.explore and (options.dashboards or options.datasources)
+    if not (options.find or options.log or explore) or options.sql is not None:
+        raise DocoptExit(
+            f"Option --format={options.format} can only be used with the subcommands "
+            "find, explore dashboards, explore datasources, and log, without SQL queries."
+        )
+    if options.format == "arrow" and importlib.util.find_spec("pyarrow") is None:
+        raise DocoptExit(
+            "Option --format=arrow requires the pyarrow package. "
+            "Please install it using `pip install 'grafana-wtf[arrow]'`."
+        )
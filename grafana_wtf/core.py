@@ -3,11 +3,17 @@
 # License: GNU Affero General Public License, Version 3
 import asyncio
 import dataclasses
-import json
+import heapq
+import itertools
 import logging
+import threading
+import time
 import warnings
-from collections import OrderedDict
+from collections import Counter, OrderedDict, deque
 from concurrent.futures.thread import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import parse_qs, urljoin, urlparse
 
 import colored
@@ -15,6 +21,7 @@ import niquests
 import requests_cache
 from grafana_client.api import GrafanaApi
 from grafana_client.client import GrafanaClientError, GrafanaUnauthorizedError
+from jsonpath_rw import parse
 from munch import Munch, munchify
 from tqdm import tqdm
 from tqdm.contrib.logging import tqdm_logging_redirect
@@ -22,15 +29,33 @@ from urllib3.exceptions import InsecureRequestWarning
 from verlib2.packaging.version import Version
 
 from grafana_wtf import __appname__, __version__
+from grafana_wtf.cache import DocumentCache
+from grafana_wtf.catalog import Catalog
 from grafana_wtf.compat import CachedSession
+from grafana_wtf.graph import DependencyGraph
+from grafana_wtf.journal import ReplaceJournal
 from grafana_wtf.model import (
+    CompactDashboard,
     DashboardDetails,
     DashboardExplorationItem,
     DatasourceExplorationItem,
     DatasourceItem,
     GrafanaDataModel,
+    ReplaceOutcome,
+    dashboard_document,
+    dashboard_uid,
+    dashboard_version,
+)
+from grafana_wtf.util import (
+    JsonPathFinder,
+    as_bool,
+    canonical_key,
+    json_escape,
+    json_text_searchable,
+    parse_timestamp,
+    to_json_text,
+    to_list,
 )
-from grafana_wtf.util import JsonPathFinder, as_bool, to_list
 
 log = logging.getLogger(__name__)
 
@@ -46,11 +71,16 @@ class GrafanaEngine:
     # The HTTP `User-Agent` header value.
     user_agent = f"{__appname__}/{__version__}"
 
+    # How often to try updating a dashboard on version conflicts.
+    replace_attempts = 3
+
     def __init__(self, grafana_url, grafana_token=None):
         self.grafana_url = grafana_url
         self.grafana_token = grafana_token
 
         self.concurrency = 0
+        self.compact = False
+        self.low_memory = False
 
         self.grafana = self.grafana_client_factory(
             self.grafana_url, grafana_token=self.grafana_token
@@ -59,6 +89,10 @@ class GrafanaEngine:
         self.data = GrafanaDataModel()
         self.finder = JsonPathFinder()
 
+        # Cache for decoded documents and persistent indexes, see `enable_cache`.
+        self.documents = None
+        self.indexes = None
+
         self.taqadum = None
         self.debug = log.getEffectiveLevel() == logging.DEBUG
         self.progressbar = not self.debug
@@ -85,6 +119,22 @@ class GrafanaEngine:
         self.set_user_agent()
 
         log.info(f"Response cache database: {session.cache.db_path}")
+
+        # Cache decoded documents next to the HTTP response cache, in order to
+        # skip JSON decoding and munchifying them on subsequent invocations.
+        self.documents = DocumentCache(
+            path=Path(session.cache.db_path).parent / f"{__appname__}-documents",
+            namespace=self.grafana_url,
+            expire_after=expire_after,
+        )
+        log.info(f"Document cache directory: {self.documents.path}")
+
+        # Indexes are validated against dashboard versions, so they never expire.
+        self.indexes = DocumentCache(
+            path=Path(session.cache.db_path).parent / f"{__appname__}-documents",
+            namespace=self.grafana_url,
+        )
+
         if drop_cache:
             log.info("Dropping response cache")
             self.clear_cache()
@@ -94,12 +144,36 @@ class GrafanaEngine:
     def clear_cache(self):
         log.info("Clearing cache")
         requests_cache.clear()
+        cache = getattr(self.grafana.client.s, "cache", None)
+        if cache is not None:
+            cache.clear()
+        if self.documents is not None:
+            self.documents.clear()
+        if self.indexes is not None:
+            self.indexes.clear()
 
     def enable_concurrency(self, concurrency: int):
         if concurrency == 1:
             concurrency = 0
         self.concurrency = concurrency
 
+    def enable_compact(self):
+        """
+        Keep dashboards in compact representation, in order to reduce memory usage.
+
+        See `CompactDashboard`.
+        """
+        self.compact = True
+
+    def enable_low_memory(self):
+        """
+        Process dashboards one by one, without retaining all of them in memory.
+
+        See `iter_dashboards`. Implies compact representation of dashboards.
+        """
+        self.low_memory = True
+        self.enable_compact()
+
     @classmethod
     def grafana_client_factory(cls, grafana_url, grafana_token=None):
         url = urlparse(grafana_url)
@@ -143,6 +217,20 @@ class GrafanaEngine:
         self.scan_dashboards()
         self.scan_datasources()
 
+    def scan_catalog(self):
+        """
+        Scan entities provided by the catalog, see `catalog`.
+
+        Folders and users will be skipped when they can not be acquired,
+        for example because of missing permissions.
+        """
+        self.scan_common()
+        for scan in [self.scan_folders, self.scan_users]:
+            try:
+                scan()
+            except GrafanaClientError as ex:
+                self.handle_grafana_error(ex)
+
     def scan_all(self):
         self.scan_common()
         self.scan_admin_stats()
@@ -185,6 +273,35 @@ class GrafanaEngine:
                 stacklevel=2,
             )
 
+    def scan_library_panels(self):
+        log.info("Scanning library panels")
+        self.data.library_panels = []
+        page = 1
+        per_page = 100
+        try:
+            while True:
+                response = self.grafana.libraryelement.list_library_elements(
+                    kind=1, per_page=per_page, page=page
+                )
+                elements = response["result"]["elements"]
+                self.data.library_panels.extend(munchify(elements))
+                if len(elements) < per_page:
+                    break
+                page += 1
+        except GrafanaClientError as ex:
+            self.handle_grafana_error(ex)
+        return self.data.library_panels
+
+    def scan_alert_rules(self):
+        log.info("Scanning alert rules")
+        try:
+            self.data.alert_rules = munchify(self.grafana.alertingprovisioning.get_alertrules_all())
+        except GrafanaClientError as ex:
+            # Alert rule provisioning is not available on older versions of Grafana.
+            self.handle_grafana_error(ex)
+            self.data.alert_rules = []
+        return self.data.alert_rules
+
     def scan_datasources(self):
         log.info("Scanning datasources")
         try:
@@ -204,6 +321,86 @@ class GrafanaEngine:
 
     def scan_dashboards(self, dashboard_uids=None):
         log.info("Scanning dashboards")
+        if self.list_dashboards(dashboard_uids) is None:
+            return None
+
+        if self.progressbar:
+            self.start_progressbar(len(self.data.dashboard_list))
+
+        if self.concurrency is None or self.concurrency <= 1:
+            self.fetch_dashboards()
+        else:
+            self.fetch_dashboards_parallel()
+
+        if self.progressbar:
+            self.taqadum.close()
+
+        # Improve determinism by returning stable sort order.
+        # Dashboards have already been munchified by `fetch_dashboard`.
+        self.data.dashboards = sorted(self.data.dashboards, key=dashboard_uid)
+
+        return self.data.dashboards
+
+    def iter_dashboards(self, dashboard_uids=None):
+        """
+        Iterate dashboards one by one, without retaining them, see `enable_low_memory`.
+
+        Dashboards are yielded in the order of the listing. Consumers need to sort
+        their results, if they want to provide a stable sort order.
+        """
+        log.info("Scanning dashboards")
+        if self.list_dashboards(dashboard_uids) is None:
+            return
+
+        dashboard_infos = [
+            dashboard_info
+            for dashboard_info in self.data.dashboard_list
+            if dashboard_info.get("type") != "dash-folder"
+        ]
+        yield from self.iter_listed_dashboards(dashboard_infos)
+
+    def iter_listed_dashboards(self, dashboard_infos):
+        """
+        Iterate dashboards of the given listing items one by one, see `iter_dashboards`.
+        """
+        if self.progressbar:
+            self.start_progressbar(len(dashboard_infos))
+        try:
+            for dashboard in self.load_dashboards(dashboard_infos):
+                if self.taqadum is not None:
+                    self.taqadum.update(1)
+                yield dashboard
+        finally:
+            if self.progressbar:
+                self.taqadum.close()
+
+    def load_dashboards(self, dashboard_infos):
+        return self.map_concurrent(self.load_dashboard, dashboard_infos)
+
+    def map_concurrent(self, function, items):
+        """
+        Apply function to items, in parallel when concurrency is enabled.
+
+        Results are yielded in order of the items. Only a bounded number of
+        items is in flight, so both items and results can be streamed.
+        """
+        if self.concurrency is None or self.concurrency <= 1:
+            yield from map(function, items)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = deque()
+            for item in items:
+                pending.append(executor.submit(function, item))
+                if len(pending) >= 2 * self.concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def list_dashboards(self, dashboard_uids=None):
+        """
+        Acquire listing of dashboards, without fetching their bodies.
+        """
         self.data.dashboard_list = []
         try:
             if dashboard_uids is not None:
@@ -231,23 +428,7 @@ class GrafanaEngine:
             self.handle_grafana_error(ex)
             return None
 
-        if self.progressbar:
-            self.start_progressbar(len(self.data.dashboard_list))
-
-        if self.concurrency is None or self.concurrency <= 1:
-            self.fetch_dashboards()
-        else:
-            self.fetch_dashboards_parallel()
-
-        if self.progressbar:
-            self.taqadum.close()
-
-        # Improve determinism by returning stable sort order.
-        self.data.dashboards = munchify(
-            sorted(self.data.dashboards, key=lambda x: x["dashboard"]["uid"])
-        )
-
-        return self.data.dashboards
+        return self.data.dashboard_list
 
     def handle_grafana_error(self, ex):
         message = "{name}: {ex}".format(name=ex.__class__.__name__, ex=ex)
@@ -261,12 +442,92 @@ class GrafanaEngine:
             )
 
     def fetch_dashboard(self, dashboard_info):
-        log.debug(f'Fetching dashboard "{dashboard_info["title"]}" ({dashboard_info["uid"]})')
-        dashboard = self.grafana.dashboard.get_dashboard(dashboard_info["uid"])
-        self.data.dashboards.append(dashboard)
+        self.data.dashboards.append(self.load_dashboard(dashboard_info))
         if self.taqadum is not None:
             self.taqadum.update(1)
 
+    def load_dashboard(self, dashboard_info):
+        """
+        Load dashboard from the document cache, or fetch it from Grafana.
+        """
+        uid = dashboard_info["uid"]
+        dashboard = None
+        if self.documents is not None:
+            dashboard = self.documents.get(self.dashboard_kind, uid)
+        if dashboard is None:
+            log.debug(f'Fetching dashboard "{dashboard_info["title"]}" ({uid})')
+            dashboard = self.store_dashboard(self.grafana.dashboard.get_dashboard(uid))
+        return dashboard
+
+    def fetch_dashboard_fresh(self, uid):
+        """
+        Fetch dashboard from Grafana, bypassing the caches, and refresh them.
+        """
+        self.invalidate_dashboard(uid)
+        return self.store_dashboard(self.grafana.dashboard.get_dashboard(uid))
+
+    @property
+    def dashboard_kind(self):
+        return "dashboard-compact" if self.compact else "dashboard"
+
+    def store_dashboard(self, response):
+        """
+        Munchify dashboard response, and store it into the document cache,
+        along with its serialized JSON text.
+        """
+        uid = response["dashboard"]["uid"]
+        if self.compact:
+            dashboard = CompactDashboard.from_response(response)
+            if self.documents is not None:
+                self.documents.set(self.dashboard_kind, uid, dashboard)
+            return dashboard
+
+        dashboard = munchify(response)
+        text = to_json_text(dashboard)
+        self.data.dashboard_texts[uid] = text
+        if self.documents is not None:
+            self.documents.set(self.dashboard_kind, uid, dashboard)
+            self.documents.set("dashboard-text", uid, text)
+        return dashboard
+
+    def dashboard_text(self, dashboard):
+        """
+        Return serialized JSON text of dashboard, computed once at fetch time.
+        """
+        if isinstance(dashboard, CompactDashboard):
+            return dashboard.text
+        uid = dashboard.dashboard.uid
+        text = self.data.dashboard_texts.get(uid)
+        if text is None and self.documents is not None:
+            text = self.documents.get("dashboard-text", uid)
+        if text is None:
+            text = to_json_text(dashboard)
+        self.data.dashboard_texts[uid] = text
+        return text
+
+    def invalidate_dashboard(self, uid):
+        """
+        Evict a single dashboard from the HTTP response cache and the document cache.
+        """
+        cache = getattr(self.grafana.client.s, "cache", None)
+        if cache is not None:
+            # Cache keys include query parameters, so also evict the version probe
+            # used by `latest_dashboard_version`.
+            paths = [
+                f"/dashboards/uid/{uid}",
+                f"/dashboards/uid/{uid}/versions",
+                f"/dashboards/uid/{uid}/versions?limit=1",
+            ]
+            cache.delete(urls=[f"{self.grafana.client.url}{path}" for path in paths])
+        if self.documents is not None:
+            self.documents.delete("dashboard", uid)
+            self.documents.delete("dashboard-compact", uid)
+            self.documents.delete("dashboard-text", uid)
+            self.documents.delete("graph", "dependencies")
+        if self.indexes is not None:
+            Indexer.evict(self.indexes, uid)
+        self.data.dashboard_texts.pop(uid, None)
+
     def fetch_dashboards(self):
         log.info("Fetching dashboards one by one")
         results = self.data.dashboard_list
@@ -387,98 +648,520 @@ class GrafanaWtf(GrafanaEngine):
         for dashboard in self.data.dashboards:
             yield DashboardDetails(dashboard=dashboard)
 
-    def search(self, expression):
+    def search(self, expression, dashboards=None):
+        """
+        Search data sources and dashboards for expression.
+
+        By default, the dashboards acquired by `scan_dashboards` will be searched.
+        When using `iter_dashboards`, only matching dashboards will be retained.
+        """
+        results = Munch(datasources=[], dashboard_list=[], dashboards=[])
+        for kind, item in self.iter_search(expression, dashboards=dashboards):
+            results[kind].append(item)
+
+        # Improve determinism by returning stable sort order.
+        if dashboards is not None:
+            results.dashboards.sort(key=lambda item: dashboard_uid(item.data))
+
+        return results
+
+    def iter_search(self, expression, dashboards=None):
+        """
+        Search data sources and dashboards for expression, generating
+        `(kind, item)` tuples as soon as items are matched.
+
+        Data sources come first, then dashboards, in order of processing.
+        """
         log.info(
             'Searching Grafana at "{}" for expression "{}"'.format(self.grafana_url, expression)
         )
 
-        results = Munch(datasources=[], dashboard_list=[], dashboards=[])
-
         # Check datasources
         log.info("Searching data sources")
-        self.search_items(expression, self.data.datasources, results.datasources)
+        for item in self.search_items(expression, self.data.datasources):
+            yield "datasources", item
 
         # Check dashboards
         log.info("Searching dashboards")
-        self.search_items(expression, self.data.dashboards, results.dashboards)
-
-        return results
-
-    def replace(self, expression, replacement, dry_run: bool = False):
+        if dashboards is None:
+            dashboards = self.data.dashboards
+        dashboards, texts = itertools.tee(dashboards)
+        for item in self.search_items(
+            expression, dashboards, texts=map(self.dashboard_text, texts)
+        ):
+            # Keep the details with the result, so reports inspect each dashboard only once.
+            item.meta.details = DashboardDetails(dashboard=item.data)
+            yield "dashboards", item
+
+    def replace(
+        self,
+        expression,
+        replacement,
+        dry_run: bool = False,
+        scope: str = None,
+        journal: ReplaceJournal = None,
+        resume: bool = False,
+        dashboards=None,
+    ):
+        if dashboards is None:
+            dashboards = self.data.dashboards
         if dry_run:
             log.info("Dry-run mode enabled, skipping any actions")
         log.info(
             f'Replacing "{expression}" by "{replacement}" within Grafana at "{self.grafana_url}"'
         )
-        for dashboard in self.data.dashboards:
-            payload_before = json.dumps(dashboard)
-            payload_after = payload_before.replace(expression, replacement)
-            if payload_before == payload_after:
-                log.info(f'No replacements for dashboard with uid "{dashboard.dashboard.uid}"')
+        if scope is not None:
+            log.info(f'Restricting replacements to scope "{scope}"')
+            scope = parse(scope)
+
+        # When resuming, skip dashboards which have been completed by a previous run.
+        completed = set()
+        if journal is not None and resume:
+            completed = journal.completed(expression=expression, replacement=replacement)
+            log.info(
+                f"Resuming from journal {journal.path}, "
+                f"skipping {len(completed)} completed dashboard(s)"
+            )
+
+        # Select dashboards which contain the expression at all. Selection is lazy,
+        # so streamed dashboards are matched and replaced within a single pass.
+        def select_candidates():
+            for dashboard in dashboards:
+                uid = dashboard_uid(dashboard)
+                if uid in completed:
+                    log.debug(f'Skipping completed dashboard with uid "{uid}"')
+                elif json_escape(expression) in self.dashboard_text(dashboard):
+                    yield dashboard
+                else:
+                    log.info(f'No replacements for dashboard with uid "{uid}"')
+
+        def replace_dashboard(dashboard):
+            outcome = self.replace_dashboard(
+                dashboard, expression, replacement, dry_run=dry_run, scope=scope
+            )
+            if journal is not None:
+                journal.record(outcome, expression=expression, replacement=replacement)
+            return outcome
+
+        start = time.monotonic()
+        if self.concurrency is not None and self.concurrency > 1:
+            log.info(f"Updating dashboards in parallel with {self.concurrency} concurrent requests")
+        outcomes = list(self.map_concurrent(replace_dashboard, select_candidates()))
+        duration = time.monotonic() - start
+
+        # Report outcomes.
+        counts = Counter(outcome.status for outcome in outcomes)
+        summary = ", ".join(f"{status}={count}" for status, count in sorted(counts.items()))
+        throughput = len(outcomes) / duration if duration else 0
+        log.info(
+            f"Processed {len(outcomes)} dashboard(s) in {duration:.2f} seconds "
+            f"({throughput:.2f} dashboards/s): {summary or 'nothing to do'}"
+        )
+        return outcomes
+
+    def replace_dashboard(
+        self, dashboard, expression, replacement, dry_run: bool = False, scope=None
+    ):
+        """
+        Replace expression within a single dashboard, using optimistic locking.
+
+        The update is submitted with the version of the dashboard it is based on.
+        When Grafana rejects it because the dashboard has been changed in the
+        meanwhile, the dashboard is fetched again, and the replacement is re-applied.
+        """
+        dashboard = dashboard_document(dashboard)
+        uid = dashboard.dashboard.uid
+        outcome = ReplaceOutcome(uid=uid, title=dashboard.dashboard.get("title"))
+        message = f'grafana-wtf: Replaced "{expression}" by "{replacement}"'
+        while outcome.attempts < self.replace_attempts:
+            outcome.attempts += 1
+
+            # The scanned dashboard may have been served from the cache,
+            # so use a fresh read of the dashboard which will be modified.
+            if not dry_run:
+                try:
+                    dashboard = dashboard_document(self.fetch_dashboard_fresh(uid))
+                except GrafanaClientError as ex:
+                    outcome.status, outcome.error = "failed", str(ex)
+                    break
+            outcome.version_before = dashboard.dashboard.get("version")
+
+            # Rewrite only string values which contain the expression.
+            dashboard_new, count = self.finder.replace(
+                expression, replacement, dashboard, text=self.dashboard_text(dashboard), scope=scope
+            )
+            if not count:
+                outcome.status = "unchanged"
+                break
+            dashboard_new["message"] = message
+            dashboard_new["overwrite"] = False
+            if dry_run:
+                outcome.status = "dry-run"
+                break
+
+            try:
+                response = self.grafana.dashboard.update_dashboard(dashboard=dashboard_new)
+            except GrafanaClientError as ex:
+                # 412 Precondition Failed: The dashboard has been changed by someone else.
+                if ex.status_code == 412:
+                    log.warning(f'Version conflict when updating dashboard with uid "{uid}": {ex}')
+                    outcome.status, outcome.error = "conflict", str(ex)
+                    continue
+                outcome.status, outcome.error = "failed", str(ex)
+                break
+            finally:
+                # Evict only the modified dashboard from the caches.
+                self.invalidate_dashboard(uid)
+
+            outcome.status, outcome.error = "updated", None
+            outcome.version_after = response.get("version")
+            break
+
+        self.report_outcome(outcome)
+        return outcome
+
+    def rollback(self, journal: ReplaceJournal, dry_run: bool = False):
+        """
+        Roll back changes of the `replace` subcommand, as recorded within its journal.
+
+        Dashboards are restored to their version before the change, but only
+        when they have not been changed again in the meanwhile.
+        """
+        if dry_run:
+            log.info("Dry-run mode enabled, skipping any actions")
+        log.info(f"Rolling back changes recorded in journal {journal.path}")
+
+        # Only consider entries which changed dashboards. Other entries, for example
+        # of dry runs, do not record the version to restore.
+        outcomes = []
+        for uid, entry in sorted(journal.latest(statuses=("updated", "restored")).items()):
+            # Skip dashboards which have already been restored.
+            if entry["status"] != "updated":
                 continue
-            dashboard_new = json.loads(payload_after)
-            dashboard_new["message"] = f'grafana-wtf: Replaced "{expression}" by "{replacement}"'
+            outcome = ReplaceOutcome(uid=uid, title=entry.get("title"), attempts=1)
+            try:
+                dashboard = self.fetch_dashboard_fresh(uid)
+                outcome.version_before = dashboard.dashboard.get("version")
+                if outcome.version_before != entry["version_after"]:
+                    outcome.status = "skipped"
+                    outcome.error = (
+                        f"Dashboard has been changed in the meanwhile, version is "
+                        f"{outcome.version_before}, expected {entry['version_after']}"
+                    )
+                elif dry_run:
+                    outcome.status = "dry-run"
+                else:
+                    # Grafana 8 and earlier does not support the uid-based endpoint yet.
+                    if Version(self.version) < Version("9"):
+                        path = f"/dashboards/id/{dashboard.dashboard.id}/restore"
+                    else:
+                        path = f"/dashboards/uid/{uid}/restore"
+                    response = self.grafana.dashboard.client.POST(
+                        path, json={"version": entry["version_before"]}
+                    )
+                    self.invalidate_dashboard(uid)
+                    outcome.status = "restored"
+                    outcome.version_after = response.get("version")
+            except GrafanaClientError as ex:
+                outcome.status, outcome.error = "failed", str(ex)
+
+            self.report_outcome(outcome)
             if not dry_run:
-                self.grafana.dashboard.update_dashboard(dashboard=dashboard_new)
+                journal.record(outcome, action="rollback")
+            outcomes.append(outcome)
+        return outcomes
+
+    @staticmethod
+    def report_outcome(outcome: ReplaceOutcome):
+        log.info(
+            f'Dashboard with uid "{outcome.uid}": {outcome.status} '
+            f"(version={outcome.version_before}, attempts={outcome.attempts})"
+            + (f": {outcome.error}" if outcome.error else "")
+        )
+
+    def log(self, dashboard_uid=None, limit: Optional[int] = None):
+        """
+        Aggregate edit history of dashboards.
 
-    def log(self, dashboard_uid=None):
+        When `limit` is given, only the `limit` most recent entries will be
+        returned, see `log_recent`.
+        """
+        prune = limit is not None and limit > 0
+        summaries = self.log_summaries(dashboard_uid=dashboard_uid, full=prune)
+        if prune:
+            return self.log_recent(list(summaries), limit)
+
+        entries = []
+        for summary in summaries:
+            entries.extend(self.log_entries(summary))
+
+        # Improve determinism by using the same order as `scan_dashboards`.
+        if self.low_memory:
+            entries.sort(key=lambda entry: entry["uid"])
+
+        return entries
+
+    def iter_log(self, dashboard_uid=None):
+        """
+        Generate entries of the edit history of dashboards as soon as they
+        are acquired, in order of processing.
+        """
+        for summary in self.log_summaries(dashboard_uid=dashboard_uid):
+            yield from self.log_entries(summary)
+
+    def log_summaries(self, dashboard_uid=None, full: bool = False):
+        """
+        Acquire summaries of dashboards for aggregating their edit history.
+
+        When `full` is given, or for a specific dashboard, full dashboards will
+        be acquired, otherwise the listing of dashboards is sufficient.
+        """
         if dashboard_uid:
             what = 'Grafana dashboard "{}"'.format(dashboard_uid)
         else:
             what = "multiple Grafana dashboards"
         log.info(f"Acquiring data for {what}")
 
-        uid_filter = None
-        if dashboard_uid:
-            uid_filter = [dashboard_uid]
-        dashboards = self.scan_dashboards(dashboard_uids=uid_filter)
+        if dashboard_uid is None and not full:
+            # The listing of dashboards provides all attributes needed.
+            summaries = self.list_dashboard_summaries()
+        else:
+            # Full dashboards are needed for their `updated` timestamps.
+            uid_filter = None
+            if dashboard_uid:
+                uid_filter = [dashboard_uid]
+            if self.low_memory:
+                dashboards = self.iter_dashboards(dashboard_uids=uid_filter)
+            else:
+                dashboards = self.scan_dashboards(dashboard_uids=uid_filter)
+            summaries = (
+                self.dashboard_summary(dashboard)
+                for dashboard in dashboards
+                if dashboard_uid is None or dashboard["dashboard"]["uid"] == dashboard_uid
+            )
 
         log.info(f"Aggregating edit history for {what}")
-        entries = []
-        for dashboard in dashboards:
-            dashboard_data = dashboard["dashboard"]
-            dashboard_meta = dashboard["meta"]
+        return summaries
 
-            if dashboard_uid is not None and dashboard_data["uid"] != dashboard_uid:
-                continue
+    def log_recent(self, dashboards: List[Munch], limit: int):
+        """
+        Compute the `limit` most recent entries of the edit history of dashboards.
+
+        The `updated` timestamp of a dashboard bounds the timestamps of its versions.
+        Dashboards are processed newest first, keeping the most recent entries on a
+        heap. Processing stops when no remaining dashboard can contribute to them.
 
-            dashboard_versions = self.get_dashboard_versions(
-                dashboard_id=dashboard_data["id"], 
-                dashboard_uid=dashboard_data["uid"],
+        Entries are returned in the same order like sorting the whole edit history
+        by timestamp would produce, including the order of entries with the same
+        timestamp.
+        """
+        latest = datetime.max.replace(tzinfo=timezone.utc)
+
+        def updated(dashboard):
+            # Process dashboards without `updated` timestamp first.
+            return parse_timestamp(dashboard.meta.updated) or latest
+
+        heap = []
+        dashboards = sorted(dashboards, key=updated, reverse=True)
+        for position, dashboard in enumerate(dashboards):
+            if len(heap) >= limit:
+                threshold = parse_timestamp(heap[0][0])
+                if threshold is not None and updated(dashboard) < threshold:
+                    skipped = len(dashboards) - position
+                    log.info(f"Skipping edit history of {skipped} older dashboard(s)")
+                    break
+            for index, entry in enumerate(self.log_entries(dashboard)):
+                # Use the position within the whole edit history as tie-breaker.
+                item = (entry["datetime"], entry["uid"], index, entry)
+                if len(heap) < limit:
+                    heapq.heappush(heap, item)
+                else:
+                    heapq.heappushpop(heap, item)
+
+        return [item[-1] for item in sorted(heap)]
+
+    def log_entries(self, dashboard: Munch):
+        dashboard_data = dashboard["dashboard"]
+        dashboard_meta = dashboard["meta"]
+        for dashboard_revision in self.dashboard_history(dashboard):
+            yield OrderedDict(
+                version=dashboard_revision["version"],
+                datetime=dashboard_revision["created"],
+                user=dashboard_revision["createdBy"],
+                message=dashboard_revision["message"],
+                folder=dashboard_meta.get("folderTitle"),
+                title=dashboard_data["title"],
+                url=urljoin(self.grafana_url, dashboard_meta["url"]),
+                id=dashboard_data["id"],
+                uid=dashboard_data["uid"],
             )
-            for dashboard_revision in dashboard_versions:
-                entry = OrderedDict(
-                    version=dashboard_revision["version"],
-                    datetime=dashboard_revision["created"],
-                    user=dashboard_revision["createdBy"],
-                    message=dashboard_revision["message"],
-                    folder=dashboard_meta.get("folderTitle"),
-                    title=dashboard_data["title"],
-                    url=urljoin(self.grafana_url, dashboard_meta["url"]),
-                    id=dashboard_data["id"],
-                    uid=dashboard_data["uid"],
-                )
-                entries.append(entry)
 
-        return entries
+    def list_dashboard_summaries(self) -> List[Munch]:
+        """
+        Acquire dashboard summaries from the listing of dashboards, without fetching
+        full dashboards, see `dashboard_summary`.
+
+        The listing does not provide versions and `updated` timestamps of dashboards.
+        """
+        summaries = [
+            self.listing_summary(item)
+            for item in self.list_dashboards() or []
+            if item.get("type") != "dash-folder"
+        ]
+
+        # Improve determinism by using the same order as `scan_dashboards`.
+        return sorted(summaries, key=lambda summary: summary.dashboard.uid)
+
+    @staticmethod
+    def listing_summary(item) -> Munch:
+        """
+        Reduce item of the listing of dashboards to a dashboard summary, see `dashboard_summary`.
+        """
+        return munchify(
+            {
+                "dashboard": {
+                    "id": item.get("id"),
+                    "uid": item["uid"],
+                    "title": item["title"],
+                    "version": None,
+                },
+                "meta": {
+                    # Grafana reports dashboards in the root folder like that.
+                    "folderTitle": item.get("folderTitle", "General"),
+                    "url": item["url"],
+                    "updated": None,
+                },
+            }
+        )
+
+    @staticmethod
+    def dashboard_summary(dashboard) -> Munch:
+        """
+        Reduce dashboard to the attributes needed for aggregating its edit history.
+        """
+        dashboard_data = dashboard["dashboard"]
+        dashboard_meta = dashboard["meta"]
+        return munchify(
+            {
+                "dashboard": {
+                    "id": dashboard_data["id"],
+                    "uid": dashboard_data["uid"],
+                    "title": dashboard_data["title"],
+                    "version": dashboard_version(dashboard),
+                },
+                "meta": {
+                    "folderTitle": dashboard_meta.get("folderTitle"),
+                    "url": dashboard_meta["url"],
+                    "updated": dashboard_meta.get("updated"),
+                },
+            }
+        )
 
-    def search_items(self, expression, items, results):
-        for item in items:
+    def search_items(self, expression, items, texts=None):
+        if texts is None:
+            texts = itertools.repeat(None)
+        # `texts` may be endless, so `zip` must stop at the end of `items`.
+        for item, text in zip(items, texts):  # noqa: B905
             effective_item = None
+
+            # Fast search whether expression is in item at all, before
+            # expanding items kept in compact representation.
+            if text is not None and json_text_searchable(expression):
+                if json_escape(expression) not in text:
+                    continue
+            item = dashboard_document(item)
+
+            # Items have already been munchified while scanning.
             if expression is None:
-                effective_item = munchify({"meta": {}, "data": item})
+                effective_item = Munch(meta=Munch(), data=item)
             else:
-                matches = self.finder.find(expression, item)
+                matches = self.finder.find(expression, item, text=text)
                 if matches:
-                    effective_item = munchify({"meta": {"matches": matches}, "data": item})
+                    effective_item = Munch(meta=Munch(matches=matches), data=item)
 
             if effective_item:
-                results.append(effective_item)
+                yield effective_item
+
+    def dashboard_history(self, dashboard) -> List:
+        """
+        Get all versions of a dashboard, newest first, using the history store.
+
+        The history store records known versions per dashboard, so only newer
+        versions will be fetched, and dashboards whose version did not change
+        will not be requested at all.
+        """
+        dashboard_data = dashboard["dashboard"]
+        uid = dashboard_data["uid"]
+        version = dashboard_version(dashboard)
+
+        state = None
+        if self.indexes is not None:
+            state = self.indexes.get("history", uid)
+
+        # Start over when the dashboard has been re-created in the meanwhile.
+        if state is not None and version is not None and version < state["version"]:
+            state = None
+
+        if state is not None and version is not None and version == state["version"]:
+            return state["versions"]
+
+        since = state["version"] if state is not None else None
+        known = state["versions"] if state is not None else []
+        versions = self.get_dashboard_versions(
+            dashboard_id=dashboard_data["id"], dashboard_uid=uid, since=since
+        )
+
+        # When the dashboard has been re-created, all of its versions have been returned.
+        if since is None or all(item["version"] > since for item in versions):
+            versions += known
+
+        if self.indexes is not None and versions:
+            state = {"version": max(item["version"] for item in versions), "versions": versions}
+            self.indexes.set("history", uid, state)
+
+        return versions
+
+    def latest_dashboard_versions(self, dashboard_infos: List) -> Dict[str, Optional[int]]:
+        """
+        Get the most recent versions of dashboards by uid, without fetching the dashboards.
+        """
+        if self.concurrency is None or self.concurrency <= 1:
+            return dict(map(self.latest_dashboard_version, dashboard_infos))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return dict(executor.map(self.latest_dashboard_version, dashboard_infos))
+
+    def latest_dashboard_version(self, dashboard_info) -> Tuple[str, Optional[int]]:
+        """
+        Get the most recent version of a dashboard from its edit history, as `(uid, version)`.
 
-    def get_dashboard_versions(self, dashboard_id=None, dashboard_uid=None):
+        The version is `None` when it can not be determined.
+        """
+        uid = dashboard_info["uid"]
+        try:
+            versions = self.get_dashboard_versions(
+                dashboard_id=dashboard_info.get("id"), dashboard_uid=uid, limit=1
+            )
+        except GrafanaClientError as ex:
+            log.warning(f"Unable to acquire versions of dashboard {uid}: {ex}")
+            return uid, None
+        if not versions:
+            return uid, None
+        return uid, max(item["version"] for item in versions)
+
+    def get_dashboard_versions(
+        self, dashboard_id=None, dashboard_uid=None, since=None, limit: Optional[int] = None
+    ):
         """
         Get all dashboard versions by dashboard UID.
 
+        When `since` is given, only versions newer than that will be returned,
+        and paging stops when reaching a known version. When the newest version
+        is older than that, the dashboard has been re-created, and all versions
+        will be returned.
+
+        When `limit` is given, only the first page of that many versions,
+        newest first, will be returned.
+
         https://grafana.com/docs/http_api/dashboard_versions/
         """
 
@@ -494,16 +1177,27 @@ class GrafanaWtf(GrafanaEngine):
             raise ValueError("Either dashboard_id or dashboard_uid must be specified")
         results = []
         params = {}
+        if limit is not None:
+            params["limit"] = limit
         while True:
             data = self.grafana.dashboard.client.GET(get_dashboard_versions_path, params=params)
             # Older Grafana returned a plain list.
             if isinstance(data, list):
-                results.extend(data)
-                break
+                versions, token = data, None
             # Newer Grafana returns a dict with `versions` and optional `continueToken`.
-            results.extend(data.get("versions", []))
-            token = data.get("continueToken")
-            if not token:
+            else:
+                versions, token = data.get("versions", []), data.get("continueToken")
+            if since is not None and not results and versions and versions[0]["version"] < since:
+                log.info("Dashboard has been re-created, fetching all versions")
+                since = None
+            if since is not None:
+                newer = [item for item in versions if item["version"] > since]
+                results.extend(newer)
+                if len(newer) < len(versions):
+                    break
+            else:
+                results.extend(versions)
+            if not token or limit is not None:
                 break
             params = {"continueToken": token}
         return results
@@ -511,12 +1205,13 @@ class GrafanaWtf(GrafanaEngine):
     def explore_datasources(self):
         # Prepare indexes, mapping dashboards by uid, datasources by name
         # as well as dashboards to datasources and vice versa.
-        ix = Indexer(engine=self)
+        # When the index is persisted, only fetch dashboards which changed.
+        ix = Indexer(engine=self, store=self.indexes, listing=self.indexes is not None)
 
         # Compute list of exploration items, associating
         # datasources with the dashboards that use them.
         results_used = []
-        results_unused = []
+        results_unused = {}
         for datasource in ix.datasources:
             ds_identifier = datasource.get("uid", datasource.get("name"))
             dashboard_uids = ix.datasource_dashboard_index.get(ds_identifier, [])
@@ -531,14 +1226,13 @@ class GrafanaWtf(GrafanaEngine):
             if dashboard_uids:
                 results_used.append(result)
             else:
-                if result not in results_unused:
-                    results_unused.append(result)
+                results_unused.setdefault(canonical_key(result), result)
 
         results_used = sorted(
             results_used, key=lambda x: x["datasource"]["name"] or x["datasource"]["uid"]
         )
         results_unused = sorted(
-            results_unused, key=lambda x: x["datasource"]["name"] or x["datasource"]["uid"]
+            results_unused.values(), key=lambda x: x["datasource"]["name"] or x["datasource"]["uid"]
         )
 
         return OrderedDict(
@@ -547,52 +1241,152 @@ class GrafanaWtf(GrafanaEngine):
         )
 
     def explore_dashboards(self, with_data_details: bool = False, queries_only: bool = False):
+        results = list(self.iter_explore_dashboards(with_data_details, queries_only))
+
+        # Improve determinism by using the same order as `scan_dashboards`.
+        if self.low_memory:
+            results.sort(key=lambda result: result["dashboard"]["uid"])
+
+        return results
+
+    def iter_explore_dashboards(self, with_data_details: bool = False, queries_only: bool = False):
+        """
+        Generate exploration results as soon as each dashboard has been processed.
+
+        In low-memory mode, results are generated in order of the dashboard
+        listing, otherwise they are ordered by dashboard uid.
+        """
         # Prepare indexes, mapping dashboards by uid, datasources by name
         # as well as dashboards to datasources and vice versa.
-        ix = Indexer(engine=self)
+        # In low-memory mode, index and explore dashboards one by one.
+        if self.low_memory:
+            ix = Indexer(engine=self, store=self.indexes, dashboards=False)
+            for dashboard in self.iter_dashboards():
+                if dashboard.meta.isFolder:
+                    continue
+                datasource_items = ix.index_dashboard(DashboardDetails(dashboard=dashboard))
+                result = self.explore_dashboard(
+                    ix, dashboard, datasource_items, with_data_details, queries_only
+                )
+                if result is not None:
+                    yield result
+            ix.save_index(full=True)
+            return
 
-        # Those dashboard names or uids will be ignored.
-        ignore_dashboards = ["-- Grafana --", "-- Mixed --", "grafana", "-- Dashboard --"]
+        ix = Indexer(engine=self, store=self.indexes)
 
         # Compute list of exploration items, looking
         # for dashboards with missing data sources.
-        results = []
         for uid in sorted(ix.dashboard_by_uid):
             dashboard = ix.dashboard_by_uid[uid]
             datasource_items = ix.dashboard_datasource_index[uid]
-
-            datasources_existing = []
-            datasources_missing = []
-            for datasource_item in datasource_items:
-                if (
-                    datasource_item.name in ignore_dashboards
-                    or datasource_item.uid in ignore_dashboards
-                    or datasource_item.type == "grafana"
-                ):
-                    continue
-                datasource_by_uid = ix.datasource_by_uid.get(datasource_item.uid)
-                datasource_by_name = ix.datasource_by_name.get(datasource_item.name)
-                datasource = datasource_by_uid or datasource_by_name
-                if datasource:
-                    datasources_existing.append(datasource)
-                else:
-                    datasources_missing.append(dataclasses.asdict(datasource_item))
-            item = DashboardExplorationItem(
-                dashboard=dashboard, datasources=datasources_existing, grafana_url=self.grafana_url
+            result = self.explore_dashboard(
+                ix, dashboard, datasource_items, with_data_details, queries_only
             )
+            if result is not None:
+                yield result
+
+    def explore_dashboard(
+        self,
+        ix: "Indexer",
+        dashboard,
+        datasource_items: List[DatasourceItem],
+        with_data_details: bool = False,
+        queries_only: bool = False,
+    ):
+        datasources_existing, datasources_missing = self.resolve_datasources(ix, datasource_items)
+        item = DashboardExplorationItem(
+            dashboard=dashboard, datasources=datasources_existing, grafana_url=self.grafana_url
+        )
+
+        # Format results, using only a subset of all the attributes.
+        result = item.format(with_data_details=with_data_details, queries_only=queries_only)
+        if result is None:
+            return None
+
+        # Add information about missing data sources.
+        if datasources_missing:
+            result["datasources_missing"] = datasources_missing
+
+        return result
+
+    @staticmethod
+    def resolve_datasources(ix: "Indexer", datasource_items: List[DatasourceItem]):
+        """
+        Resolve data source references of a dashboard into existing and missing ones.
+        """
+        # Those dashboard names or uids will be ignored.
+        ignore_dashboards = ["-- Grafana --", "-- Mixed --", "grafana", "-- Dashboard --"]
 
-            # Format results, using only a subset of all the attributes.
-            result = item.format(with_data_details=with_data_details, queries_only=queries_only)
-            if result is None:
+        datasources_existing = []
+        datasources_missing = []
+        for datasource_item in datasource_items:
+            if (
+                datasource_item.name in ignore_dashboards
+                or datasource_item.uid in ignore_dashboards
+                or datasource_item.type == "grafana"
+            ):
                 continue
+            datasource_by_uid = ix.datasource_by_uid.get(datasource_item.uid)
+            datasource_by_name = ix.datasource_by_name.get(datasource_item.name)
+            datasource = datasource_by_uid or datasource_by_name
+            if datasource:
+                datasources_existing.append(datasource)
+            else:
+                datasources_missing.append(dataclasses.asdict(datasource_item))
+        return datasources_existing, datasources_missing
 
-            # Add information about missing data sources.
-            if datasources_missing:
-                result["datasources_missing"] = datasources_missing
+    def catalog(self, search_results=None, dashboards=None, connection=None) -> Catalog:
+        """
+        Build catalog of scanned entities, for querying them per SQL.
 
-            results.append(result)
+        When search results are given, the catalog includes matching
+        dashboards and the matches. When dashboards are given, it includes
+        those, otherwise all scanned dashboards.
+        """
+        catalog = Catalog(connection=connection)
+        if search_results is not None:
+            dashboards = [item.data for item in search_results.dashboards]
+            catalog.add_matches(search_results)
+        elif dashboards is None:
+            dashboards = self.data.dashboards or []
+
+        # Resolve data sources used by dashboards, like `explore dashboards`.
+        ix = Indexer(engine=self, store=self.indexes, dashboards=False)
+        for dashboard in dashboards:
+            if dashboard["meta"].get("isFolder"):
+                continue
+            datasource_items = ix.index_dashboard(DashboardDetails(dashboard=dashboard))
+            existing, missing = self.resolve_datasources(ix, datasource_items)
+            catalog.add_dashboard_datasources(dashboard_uid(dashboard), existing, missing)
+        ix.save_index()
+
+        catalog.add_dashboards(dashboards)
+        catalog.add_datasources(self.data.datasources)
+        catalog.add_folders(self.data.folders)
+        catalog.add_users(self.data.users)
+        return catalog
+
+    def dependency_graph(self) -> DependencyGraph:
+        """
+        Build graph of dependencies between all entities of the Grafana instance.
 
-        return results
+        The graph is stored into the document cache, so subsequent queries do
+        not need to scan the Grafana instance again.
+        """
+        graph = None
+        if self.documents is not None:
+            graph = self.documents.get("graph", "dependencies")
+        if graph is None:
+            self.scan_dashboards()
+            self.scan_datasources()
+            self.scan_folders()
+            self.scan_library_panels()
+            self.scan_alert_rules()
+            graph = DependencyGraph.from_data(self.data)
+            if self.documents is not None:
+                self.documents.set("graph", "dependencies", graph)
+        return graph
 
     def explore_permissions(self):
         self.scan_folders()
@@ -605,7 +1399,7 @@ class GrafanaWtf(GrafanaEngine):
             items.append(item)
 
         for dashboard in self.data.dashboards:
-            perms = self.grafana.dashboard.get_permissions_by_uid(dashboard["dashboard"]["uid"])
+            perms = self.grafana.dashboard.get_permissions_by_uid(dashboard_uid(dashboard))
             item = OrderedDict(item=dashboard["meta"], type="dashboard", permissions=perms)
             items.append(item)
 
@@ -712,9 +1506,21 @@ class GrafanaWtf(GrafanaEngine):
 
 
 class Indexer:
-    def __init__(self, engine: GrafanaWtf):
+    # Serialize updates of the persisted index, see `evict`.
+    store_lock = threading.Lock()
+
+    def __init__(
+        self,
+        engine: GrafanaWtf,
+        store: Optional[DocumentCache] = None,
+        dashboards: bool = True,
+        listing: bool = False,
+    ):
         self.engine = engine
 
+        # Persist the dashboard to data source index, see `index_dashboards`.
+        self.store = store
+
         # Prepare index data structures.
         self.dashboard_by_uid = {}
         self.datasource_by_ident = {}
@@ -723,25 +1529,35 @@ class Indexer:
         self.dashboard_datasource_index = {}
         self.datasource_dashboard_index = {}
 
-        # Gather all data.
-        self.dashboards = self.engine.scan_dashboards()
+        # Gather all data. When `dashboards` is false, dashboards are not scanned
+        # up front, but can be indexed one by one, using `index_dashboard`. When
+        # `listing` is true, only dashboards which changed are fetched, see `index_listing`.
+        self.dashboards = self.engine.scan_dashboards() if dashboards and not listing else []
         self.datasources = self.engine.scan_datasources()
 
         # Invoke indexer.
-        self.index()
+        self.index(dashboards=dashboards, listing=listing)
 
-    def index(self):
+    def index(self, dashboards: bool = True, listing: bool = False):
         self.index_datasources()
-        self.index_dashboards()
-        self.index_crossref()
+        if listing:
+            self.index_listing()
+            self.index_crossref()
+        elif dashboards:
+            self.index_dashboards()
+            self.index_crossref()
+        else:
+            self.load_index()
 
     def collect_datasource_items(self, element):
         element = element or []
-        items = []
+
+        # Deduplicate items, retaining insertion order.
+        items = {}
 
         def add(item):
-            if item is not None and item not in items:
-                items.append(item)
+            if item is not None:
+                items.setdefault(canonical_key(item), item)
 
         for node in element:
             # Directly defined datasources.
@@ -771,11 +1587,19 @@ class Indexer:
                     add(ds)
                 continue
 
-        return items
+        return list(items.values())
 
     def index_dashboards(self):
+        """
+        Map dashboards to the data sources they are using.
+
+        When a `store` is given, the index is persisted, and only dashboards
+        whose version changed since the previous run will be inspected. Data
+        sources referenced by templating variables are resolved by name, so
+        the whole index is rebuilt when data sources have changed.
+        """
         self.dashboard_by_uid = {}
-        self.dashboard_datasource_index = {}
+        self.load_index()
 
         for dbdetails in self.engine.dashboard_details():
             dashboard = dbdetails.dashboard
@@ -784,21 +1608,143 @@ class Indexer:
                 continue
 
             # Index by uid.
-            uid = dashboard.dashboard.uid
+            uid = dashboard_uid(dashboard)
             self.dashboard_by_uid[uid] = dashboard
 
             # Map to data source names.
-            ds_panels = self.collect_datasource_items(dbdetails.panels)
-            ds_annotations = self.collect_datasource_items(dbdetails.annotations)
-            ds_templating = self.collect_datasource_items(dbdetails.templating)
-
-            results = []
-            for bucket in ds_panels, ds_annotations, ds_templating:
-                for item in bucket:
-                    item = DatasourceItem.from_payload(item)
-                    if item not in results:
-                        results.append(item)
-            self.dashboard_datasource_index[uid] = results
+            self.index_dashboard(dbdetails)
+
+        self.save_index(full=True)
+
+    def index_listing(self):
+        """
+        Map dashboards to the data sources they are using, based on the listing of dashboards.
+
+        Dashboards whose most recent version matches their entry in the persisted
+        index are represented by their summary from the listing, without fetching
+        their bodies. All other dashboards are fetched and inspected.
+        """
+        self.dashboard_by_uid = {}
+        self.load_index()
+
+        # Retain the persisted index when the listing can not be acquired.
+        dashboard_list = self.engine.list_dashboards()
+        if dashboard_list is None:
+            return
+        dashboard_infos = [
+            dashboard_info
+            for dashboard_info in dashboard_list
+            if dashboard_info.get("type") != "dash-folder"
+        ]
+        versions = self.engine.latest_dashboard_versions(
+            [info for info in dashboard_infos if info["uid"] in self.index_previous]
+        )
+
+        changed = []
+        for dashboard_info in dashboard_infos:
+            uid = dashboard_info["uid"]
+            entry = self.index_previous.get(uid)
+            if entry is None or entry[0] is None or entry[0] != versions.get(uid):
+                changed.append(dashboard_info)
+                continue
+            self.dashboard_by_uid[uid] = self.engine.listing_summary(dashboard_info)
+            self.index_entries[uid] = entry
+            self.dashboard_datasource_index[uid] = entry[1]
+
+        log.info(f"Inspecting {len(changed)} out of {len(dashboard_infos)} dashboard(s)")
+        for dashboard in self.engine.iter_listed_dashboards(changed):
+            self.dashboard_by_uid[dashboard_uid(dashboard)] = dashboard
+            self.index_dashboard(DashboardDetails(dashboard=dashboard))
+
+        # Improve determinism by using the same order as `scan_dashboards`.
+        self.dashboard_datasource_index = dict(sorted(self.dashboard_datasource_index.items()))
+
+        self.save_index(full=True)
+
+    def load_index(self):
+        self.dashboard_datasource_index = {}
+        self.index_entries = {}
+        self.index_previous = {}
+        self.index_fingerprint = self.datasource_fingerprint()
+        if self.store is not None:
+            state = self.store.get("index", "dashboard-datasources")
+            if state is not None and state["fingerprint"] == self.index_fingerprint:
+                self.index_previous = state["dashboards"]
+
+    @classmethod
+    def evict(cls, store: DocumentCache, uid: str):
+        """
+        Remove a single dashboard from the persisted index, after it has been modified.
+        """
+        with cls.store_lock:
+            state = store.get("index", "dashboard-datasources")
+            if state is not None and uid in state["dashboards"]:
+                del state["dashboards"][uid]
+                store.set("index", "dashboard-datasources", state)
+
+    def save_index(self, full: bool = False):
+        """
+        Persist the index, merging the entries of the dashboards indexed so far.
+
+        Entries of dashboards which have not been indexed are retained, unless
+        all dashboards have been indexed (`full`), so entries of dashboards
+        which no longer exist are dropped.
+        """
+        if self.store is None:
+            return
+        if full:
+            entries = self.index_entries
+        else:
+            entries = {**self.index_previous, **self.index_entries}
+        if entries != self.index_previous:
+            state = {"fingerprint": self.index_fingerprint, "dashboards": entries}
+            self.store.set("index", "dashboard-datasources", state)
+
+    def index_dashboard(self, dbdetails: DashboardDetails) -> List[DatasourceItem]:
+        """
+        Map single dashboard to the data sources it is using, reusing unchanged entries.
+        """
+        dashboard = dbdetails.dashboard
+        uid = dashboard_uid(dashboard)
+        version = dashboard_version(dashboard)
+        entry = self.index_previous.get(uid)
+        if version is None or entry is None or entry[0] != version:
+            entry = (version, self.collect_dashboard_datasource_items(dbdetails))
+        self.index_entries[uid] = entry
+        self.dashboard_datasource_index[uid] = entry[1]
+        return entry[1]
+
+    def collect_dashboard_datasource_items(
+        self, dbdetails: DashboardDetails
+    ) -> List[DatasourceItem]:
+        ds_panels = self.collect_datasource_items(dbdetails.panels)
+        ds_annotations = self.collect_datasource_items(dbdetails.annotations)
+        ds_templating = self.collect_datasource_items(dbdetails.templating)
+
+        # Deduplicate items, retaining insertion order.
+        results = {}
+        for bucket in ds_panels, ds_annotations, ds_templating:
+            for item in bucket:
+                results.setdefault(DatasourceItem.from_payload(item))
+        return list(results)
+
+    def datasource_fingerprint(self):
+        """
+        Compute a key identifying the data source attributes used for indexing dashboards.
+        """
+        return tuple(
+            sorted(
+                canonical_key(
+                    dict(
+                        type=datasource.get("type"),
+                        uid=datasource.get("uid"),
+                        name=datasource.get("name"),
+                        url=datasource.get("url"),
+                    )
+                )
+                for datasource in self.datasource_by_name.values()
+            )
+        )
 
     def index_datasources(self):
         self.datasource_by_ident = {}
@@ -814,7 +1760,7 @@ class Indexer:
                 self.datasource_by_uid[datasource.uid] = datasource
 
     def index_crossref(self):
-        for dashboard_uid, datasource_items in self.dashboard_datasource_index.items():
+        for uid, datasource_items in self.dashboard_datasource_index.items():
             datasource_item: DatasourceItem
             for datasource_item in datasource_items:
                 datasource_name_or_uid = datasource_item.uid or datasource_item.name
@@ -822,4 +1768,4 @@ class Indexer:
                     if "uid" in self.datasource_by_name[datasource_name_or_uid]:
                         datasource_name_or_uid = self.datasource_by_name[datasource_name_or_uid].uid
                 self.datasource_dashboard_index.setdefault(datasource_name_or_uid, [])
-                self.datasource_dashboard_index[datasource_name_or_uid].append(dashboard_uid)
+                self.datasource_dashboard_index[datasource_name_or_uid].append(uid)
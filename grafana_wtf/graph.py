@@ -0,0 +1,278 @@
+import logging
+import re
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from grafana_wtf.model import GrafanaDataModel
+from grafana_wtf.util import to_list
+
+log = logging.getLogger(__name__)
+
+
+class DependencyGraph:
+    """
+    Directed graph of Grafana entities and their dependencies.
+
+    Nodes are identified by `<kind>:<identifier>`, for example `dashboard:<uid>`
+    or `datasource:<uid>`. Panels and template variables are scoped to their
+    dashboards, like `panel:<dashboard uid>/<panel id>`. Edges point from the
+    dependent entity to its dependency, and are typed by relation.
+
+    Forward traversal answers "what does this entity use", reverse traversal
+    answers "what uses this entity", for example before decommissioning a
+    data source.
+    """
+
+    # Data source references which do not designate real data sources.
+    ignore_datasources = ("-- Grafana --", "-- Mixed --", "-- Dashboard --", "grafana", "__expr__")
+
+    # Data source references by template variable, like `$ds`, `${ds}`, or `${ds:text}`.
+    variable_pattern = re.compile(r"^\$\{?(\w+)(?::\w+)?\}?$")
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.forward: Dict[str, Dict[str, str]] = {}
+        self.reverse: Dict[str, Dict[str, str]] = {}
+
+    def add_node(self, node: str, kind: str, **attributes):
+        entry = self.nodes.setdefault(node, {"kind": kind})
+        entry.update({key: value for key, value in attributes.items() if value is not None})
+        self.forward.setdefault(node, {})
+        self.reverse.setdefault(node, {})
+        return node
+
+    def add_edge(self, source: str, target: str, relation: str):
+        self.forward[source].setdefault(target, relation)
+        self.reverse[target].setdefault(source, relation)
+
+    def traverse(self, node: str, reverse: bool = False) -> List[Dict[str, Any]]:
+        """
+        Compute all nodes reachable from `node`, in breadth-first order.
+
+        Each result item records the node it has been reached from, the
+        relation between both, and the distance to the start node.
+        """
+        adjacency = self.reverse if reverse else self.forward
+        seen = {node}
+        queue = deque([(node, 0)])
+        results = []
+        while queue:
+            current, depth = queue.popleft()
+            for neighbour in sorted(adjacency[current]):
+                if neighbour in seen:
+                    continue
+                seen.add(neighbour)
+                queue.append((neighbour, depth + 1))
+                results.append(
+                    OrderedDict(
+                        node=neighbour,
+                        **self.nodes[neighbour],
+                        relation=adjacency[current][neighbour],
+                        via=current,
+                        depth=depth + 1,
+                    )
+                )
+        return results
+
+    def resolve(self, spec: str) -> Optional[str]:
+        """
+        Resolve node by identifier, or by `<kind>:<name>` or `<kind>:<title>`.
+        """
+        if spec in self.nodes:
+            return spec
+        kind, _, name = spec.partition(":")
+        for node, attributes in self.nodes.items():
+            if attributes["kind"] != kind:
+                continue
+            if name in (attributes.get("name"), attributes.get("title")):
+                return node
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        kinds = OrderedDict()
+        for attributes in self.nodes.values():
+            kinds[attributes["kind"]] = kinds.get(attributes["kind"], 0) + 1
+        relations = OrderedDict()
+        for targets in self.forward.values():
+            for relation in targets.values():
+                relations[relation] = relations.get(relation, 0) + 1
+        return OrderedDict(
+            nodes=OrderedDict(sorted(kinds.items())),
+            edges=OrderedDict(sorted(relations.items())),
+        )
+
+    @classmethod
+    def from_data(cls, data: GrafanaDataModel) -> "DependencyGraph":
+        return GraphBuilder(data).build()
+
+
+class GraphBuilder:
+    """
+    Build a `DependencyGraph` from the entities of a `GrafanaDataModel`.
+    """
+
+    def __init__(self, data: GrafanaDataModel):
+        self.data = data
+        self.graph = DependencyGraph()
+        self.datasource_by_uid = {}
+        self.datasource_by_name = {}
+        self.folder_by_id = {}
+
+    def build(self) -> DependencyGraph:
+        self.add_datasources()
+        self.add_folders()
+        self.add_library_panels()
+        self.add_dashboards()
+        self.add_alert_rules()
+        return self.graph
+
+    def add_datasources(self):
+        for datasource in self.data.datasources or []:
+            uid = datasource.get("uid") or datasource.get("name")
+            node = self.graph.add_node(
+                f"datasource:{uid}",
+                kind="datasource",
+                name=datasource.get("name"),
+                type=datasource.get("type"),
+            )
+            self.datasource_by_uid[uid] = node
+            self.datasource_by_name[datasource.get("name")] = node
+
+    def add_folders(self):
+        for folder in self.data.folders or []:
+            self.folder_by_id[folder.get("id")] = folder["uid"]
+            self.graph.add_node(f"folder:{folder['uid']}", kind="folder", title=folder.get("title"))
+        for folder in self.data.folders or []:
+            if folder.get("parentUid"):
+                self.graph.add_edge(
+                    f"folder:{folder['uid']}", self.folder_node(folder["parentUid"]), "folder"
+                )
+
+    def add_library_panels(self):
+        for element in self.data.library_panels or []:
+            node = self.graph.add_node(
+                f"library-panel:{element['uid']}", kind="library-panel", name=element.get("name")
+            )
+            if element.get("folderUid"):
+                self.graph.add_edge(node, self.folder_node(element["folderUid"]), "folder")
+            self.add_panel_datasources(node, element.get("model") or {}, variables={})
+
+    def add_dashboards(self):
+        for dashboard in self.data.dashboards or []:
+            meta = dashboard.get("meta", {})
+            if meta.get("isFolder"):
+                continue
+            content = dashboard["dashboard"]
+            uid = content["uid"]
+            node = self.graph.add_node(
+                f"dashboard:{uid}",
+                kind="dashboard",
+                title=content.get("title"),
+                url=meta.get("url"),
+            )
+
+            # Folders are referenced by uid on recent Grafana versions, and by id before.
+            folder_uid = meta.get("folderUid") or self.folder_by_id.get(meta.get("folderId"))
+            if folder_uid:
+                self.graph.add_edge(node, self.folder_node(folder_uid), "folder")
+
+            variables = {}
+            for variable in content.get("templating", {}).get("list", []):
+                variable_node = self.graph.add_node(
+                    f"variable:{uid}/{variable['name']}",
+                    kind="variable",
+                    name=variable["name"],
+                    type=variable.get("type"),
+                )
+                variables[variable["name"]] = variable_node
+                self.graph.add_edge(node, variable_node, "variable")
+            for variable in content.get("templating", {}).get("list", []):
+                variable_node = variables[variable["name"]]
+                if variable.get("type") == "datasource":
+                    # Data source variables select data sources by name.
+                    for name in to_list((variable.get("current") or {}).get("value")):
+                        target = self.datasource_by_name.get(name)
+                        if target is not None:
+                            self.graph.add_edge(variable_node, target, "datasource")
+                else:
+                    self.add_datasource_edge(variable_node, variable.get("datasource"), variables)
+
+            for annotation in content.get("annotations", {}).get("list", []):
+                self.add_datasource_edge(
+                    node, annotation.get("datasource"), variables, relation="annotation"
+                )
+
+            for panel in self.walk_panels(content.get("panels", [])):
+                panel_node = self.graph.add_node(
+                    f"panel:{uid}/{panel.get('id')}", kind="panel", title=panel.get("title")
+                )
+                self.graph.add_edge(node, panel_node, "panel")
+                library_panel = panel.get("libraryPanel")
+                if library_panel and library_panel.get("uid"):
+                    target = self.graph.add_node(
+                        f"library-panel:{library_panel['uid']}",
+                        kind="library-panel",
+                        name=library_panel.get("name"),
+                    )
+                    self.graph.add_edge(panel_node, target, "library-panel")
+                self.add_panel_datasources(panel_node, panel, variables)
+
+    def add_alert_rules(self):
+        for rule in self.data.alert_rules or []:
+            node = self.graph.add_node(
+                f"alert-rule:{rule['uid']}", kind="alert-rule", title=rule.get("title")
+            )
+            if rule.get("folderUID"):
+                self.graph.add_edge(node, self.folder_node(rule["folderUID"]), "folder")
+            for query in rule.get("data") or []:
+                self.add_datasource_edge(node, query.get("datasourceUid"), {})
+
+            # Alert rules can be linked to dashboard panels.
+            annotations = rule.get("annotations") or {}
+            dashboard_uid = annotations.get("__dashboardUid__")
+            if dashboard_uid:
+                target = f"dashboard:{dashboard_uid}"
+                if annotations.get("__panelId__"):
+                    target = f"panel:{dashboard_uid}/{annotations['__panelId__']}"
+                if target in self.graph.nodes:
+                    self.graph.add_edge(node, target, self.graph.nodes[target]["kind"])
+
+    def add_panel_datasources(self, node: str, panel: Dict, variables: Dict[str, str]):
+        self.add_datasource_edge(node, panel.get("datasource"), variables)
+        for target in panel.get("targets") or []:
+            self.add_datasource_edge(node, target.get("datasource"), variables)
+
+    def add_datasource_edge(
+        self, node: str, reference: Any, variables: Dict[str, str], relation: str = "datasource"
+    ):
+        """
+        Add edge to data source, referenced by uid, by name, or by template variable.
+        """
+        if isinstance(reference, dict):
+            reference = reference.get("uid") or reference.get("name")
+        if not isinstance(reference, str) or reference in self.graph.ignore_datasources:
+            return
+        match = self.graph.variable_pattern.match(reference)
+        if match:
+            target = variables.get(match.group(1))
+            if target is not None:
+                self.graph.add_edge(node, target, "variable")
+            return
+        target = self.datasource_by_uid.get(reference) or self.datasource_by_name.get(reference)
+        if target is None:
+            # Reference to data source which does not exist.
+            target = self.graph.add_node(f"datasource:{reference}", kind="datasource", missing=True)
+            self.datasource_by_uid[reference] = target
+        self.graph.add_edge(node, target, relation)
+
+    def folder_node(self, uid: str) -> str:
+        return self.graph.add_node(f"folder:{uid}", kind="folder")
+
+    @classmethod
+    def walk_panels(cls, panels: Iterable[Dict]):
+        """
+        Iterate panels, including the ones nested into collapsed rows.
+        """
+        for panel in panels or []:
+            yield panel
+            yield from cls.walk_panels(panel.get("panels"))
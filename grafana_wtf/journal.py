@@ -0,0 +1,89 @@
+import dataclasses
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from grafana_wtf.codec import json_dumps_compact, json_loads
+from grafana_wtf.model import ReplaceOutcome
+
+log = logging.getLogger(__name__)
+
+
+class ReplaceJournal:
+    """
+    Record the outcomes of the `replace` subcommand into a file, in JSON Lines format.
+
+    Each line records a single dashboard, including its version before and after
+    the change. The journal is used to skip completed dashboards when resuming an
+    interrupted run, and to roll back changes.
+    """
+
+    # Outcomes of dashboards which do not need to be processed again.
+    completed_status = ("updated", "unchanged")
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+
+    def read(self) -> List[Dict]:
+        if not self.path.exists():
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json_loads(line))
+                except json.JSONDecodeError as ex:
+                    # The last line may be truncated when the process has been killed.
+                    log.warning(f"Ignoring invalid journal entry at {self.path}:{number}: {ex}")
+        return entries
+
+    def latest(self, statuses: Optional[Tuple[str, ...]] = None, **context) -> Dict[str, Dict]:
+        """
+        Return the most recent journal entry per dashboard uid.
+
+        When given, only consider entries having one of the `statuses`,
+        and matching all `context` attributes.
+        """
+        return {
+            entry["uid"]: entry
+            for entry in self.read()
+            if (statuses is None or entry.get("status") in statuses)
+            and all(entry.get(key) == value for key, value in context.items())
+        }
+
+    def completed(self, **context) -> Set[str]:
+        """
+        Return uids of dashboards which have been processed successfully.
+
+        Dashboards which have been restored by a rollback afterwards are not
+        considered to be completed, so they will be processed again.
+        """
+        latest = {}
+        for entry in self.read():
+            if entry.get("action") == "rollback":
+                if entry.get("status") == "restored":
+                    latest[entry["uid"]] = entry
+            elif all(entry.get(key) == value for key, value in context.items()):
+                latest[entry["uid"]] = entry
+        return {
+            uid
+            for uid, entry in latest.items()
+            if entry.get("action") != "rollback" and entry["status"] in self.completed_status
+        }
+
+    def record(self, outcome: ReplaceOutcome, **context):
+        entry = dataclasses.asdict(outcome)
+        entry.update(context)
+        entry["timestamp"] = datetime.now(tz=timezone.utc).isoformat()
+        line = json_dumps_compact(entry) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
@@ -2,13 +2,18 @@
 # (c) 2021 Andreas Motl <andreas@hiveeyes.org>
 # License: GNU Affero General Public License, Version 3
 import dataclasses
+import functools
 import logging
 import warnings
 from collections import OrderedDict
+from collections.abc import Mapping
 from typing import Any, Dict, List, Optional
 from urllib.parse import urljoin
 
-from munch import Munch
+from munch import Munch, munchify
+
+from grafana_wtf.codec import json_dumps_compact, json_loads
+from grafana_wtf.util import canonical_key, to_json_text
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +23,7 @@ class GrafanaDataModel:
     admin_stats: Optional[Dict] = dataclasses.field(default_factory=dict)
     dashboards: Optional[List[Munch]] = dataclasses.field(default_factory=list)
     dashboard_list: Optional[List[Munch]] = dataclasses.field(default_factory=list)
+    dashboard_texts: Optional[Dict[str, str]] = dataclasses.field(default_factory=dict)
     datasources: Optional[List[Munch]] = dataclasses.field(default_factory=list)
     folders: Optional[List[Munch]] = dataclasses.field(default_factory=list)
     organizations: Optional[List[Munch]] = dataclasses.field(default_factory=list)
@@ -26,23 +32,206 @@ class GrafanaDataModel:
     annotations: Optional[List[Munch]] = dataclasses.field(default_factory=list)
     snapshots: Optional[List[Munch]] = dataclasses.field(default_factory=list)
     notifications: Optional[List[Munch]] = dataclasses.field(default_factory=list)
+    library_panels: Optional[List[Munch]] = dataclasses.field(default_factory=list)
+    alert_rules: Optional[List[Munch]] = dataclasses.field(default_factory=list)
+
+
+class LazyDocument(Mapping):
+    """
+    JSON object whose members are kept as serialized JSON text, encoded to
+    bytes, and decoded only when they are accessed.
+
+    Decoded members are not retained, so memory usage only grows with the
+    members which are currently in use.
+    """
+
+    __slots__ = ("members",)
+
+    def __init__(self, members: Dict[str, bytes]):
+        self.members = members
+
+    @classmethod
+    def from_data(cls, data: Dict) -> "LazyDocument":
+        return cls(
+            {
+                key: to_json_text(value, sort_keys=False).encode("utf-8")
+                for key, value in data.items()
+            }
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        return munchify(json_loads(self.members[key]))
+
+    def __getattr__(self, key: str) -> Any:
+        # Guard against recursion while unpickling, before `members` has been set.
+        if key == "members" or key.startswith("__"):
+            raise AttributeError(key)
+        try:
+            return self[key]
+        except KeyError as ex:
+            raise AttributeError(key) from ex
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, key) -> bool:
+        return key in self.members
+
+    def __getstate__(self):
+        return self.members
+
+    def __setstate__(self, state):
+        self.members = state
+
+    def to_munch(self) -> Munch:
+        return Munch((key, self[key]) for key in self.members)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize into JSON text, without decoding any members.
+        """
+        members = (
+            json_dumps_compact(key).encode("utf-8") + b":" + value
+            for key, value in self.members.items()
+        )
+        return b"{" + b",".join(members) + b"}"
+
+
+class CompactDashboard:
+    """
+    Compact representation of a dashboard, see `GrafanaEngine.enable_compact`.
+
+    Only the attributes needed for indexing and reporting are kept as Python
+    objects. The dashboard body is kept as `LazyDocument`, so subtrees like
+    `panels` are only decoded when they are accessed.
+    """
+
+    __slots__ = ("meta", "uid", "title", "version", "dashboard")
+
+    def __init__(self, meta: Munch, uid: str, title: str, version: int, dashboard: LazyDocument):
+        self.meta = meta
+        self.uid = uid
+        self.title = title
+        self.version = version
+        self.dashboard = dashboard
+
+    @classmethod
+    def from_response(cls, response: Dict) -> "CompactDashboard":
+        """
+        Create compact dashboard from API response.
+        """
+        content = response["dashboard"]
+        return cls(
+            meta=munchify(response.get("meta", {})),
+            uid=content["uid"],
+            title=content.get("title"),
+            version=content.get("version"),
+            dashboard=LazyDocument.from_data(content),
+        )
+
+    @property
+    def text(self) -> str:
+        """
+        Serialized JSON text of the complete document, see `to_json_text`.
+        """
+        meta = to_json_text(self.meta, sort_keys=False).encode("utf-8")
+        text = b'{"meta":' + meta + b',"dashboard":' + self.dashboard.to_bytes() + b"}"
+        return text.decode("utf-8")
+
+    def document(self) -> Munch:
+        return Munch(meta=self.meta, dashboard=self.dashboard.to_munch())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in ("meta", "dashboard"):
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in ("meta", "dashboard"):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in ("meta", "dashboard")
+
+    def __repr__(self):
+        return f"<CompactDashboard uid={self.uid!r} title={self.title!r} version={self.version!r}>"
+
+
+def dashboard_document(dashboard) -> Munch:
+    """
+    Return the complete dashboard document, expanding compact representations.
+    """
+    if isinstance(dashboard, CompactDashboard):
+        return dashboard.document()
+    return dashboard
+
+
+def dashboard_uid(dashboard) -> str:
+    if isinstance(dashboard, CompactDashboard):
+        return dashboard.uid
+    return dashboard["dashboard"]["uid"]
+
+
+def dashboard_version(dashboard) -> Optional[int]:
+    if isinstance(dashboard, CompactDashboard):
+        return dashboard.version
+    return dashboard["dashboard"].get("version")
 
 
 @dataclasses.dataclass
 class DashboardDetails:
     dashboard: Dict
 
+    @functools.cached_property
+    def content(self) -> Dict:
+        # Decode compact representations only once.
+        return self.dashboard["dashboard"]
+
     @property
     def panels(self) -> List:
-        return self.dashboard.dashboard.get("panels", [])
+        return self.content.get("panels", [])
 
     @property
     def annotations(self) -> List:
-        return self.dashboard.dashboard.get("annotations", {}).get("list", [])
+        return self.content.get("annotations", {}).get("list", [])
 
     @property
     def templating(self) -> List:
-        return self.dashboard.dashboard.get("templating", {}).get("list", [])
+        return self.content.get("templating", {}).get("list", [])
+
+    @functools.cached_property
+    def datasource_references(self) -> List:
+        return collect_datasource_references(self.dashboard)
+
+
+def collect_datasource_references(document) -> List:
+    """
+    Collect unique data source references from all levels of a document,
+    in order of appearance, like the JSONPath expression `$..datasource`.
+
+    References by name are returned as strings, references by uid and type
+    as dictionaries. Empty references are skipped.
+    """
+    references = {}
+
+    def visit(value):
+        if isinstance(value, dict):
+            reference = value.get("datasource")
+            if reference:
+                reference = dict(reference) if isinstance(reference, Munch) else str(reference)
+                references.setdefault(canonical_key(reference), reference)
+            for item in value.values():
+                visit(item)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item)
+
+    visit(document)
+    return list(references.values())
 
 
 @dataclasses.dataclass
@@ -82,17 +271,19 @@ class DashboardDataDetails:
         Select all element nodes which have a "datasource" attribute.
         """
         element = element or []
-        items = []
+
+        # Deduplicate items, retaining insertion order.
+        items = {}
 
         def add(item):
-            if item is not None and item not in items:
-                items.append(item)
+            if item is not None:
+                items.setdefault(canonical_key(item), item)
 
         for node in element:
             if "datasource" in node and node["datasource"]:
                 add(node)
 
-        return items
+        return list(items.values())
 
     @staticmethod
     def _format_panel_compact(panel):
@@ -163,7 +354,7 @@ class DashboardDataDetails:
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class DatasourceItem:
     """
     Represent a datasource reference within a panel, annotation, or templating (variable).
@@ -285,3 +476,18 @@ class DashboardExplorationItem:
         if queries_only:
             dbdatadetails = dbdatadetails.queries_only()
         return dbdatadetails
+
+
+@dataclasses.dataclass
+class ReplaceOutcome:
+    """
+    Represent the outcome of replacing an expression within a single dashboard.
+    """
+
+    uid: str
+    title: Optional[str] = None
+    status: Optional[str] = None
+    version_before: Optional[int] = None
+    version_after: Optional[int] = None
+    attempts: int = 0
+    error: Optional[str] = None
@@ -0,0 +1,175 @@
+"""
+Output results in columnar formats, for loading them into data frames, or
+memory-mapping them, without parsing JSON.
+
+Nested results are flattened into a single table per subcommand, and written
+in batches of rows, using DuckDB.
+
+- https://parquet.apache.org/
+- https://arrow.apache.org/docs/format/Columnar.html#ipc-file-format
+"""
+
+import typing as t
+from collections import OrderedDict
+
+from grafana_wtf.catalog import Catalog
+from grafana_wtf.sql import BATCH_SIZE, connect, quote_string, records_source
+
+trecord = t.Dict[str, t.Any]
+
+COLUMNAR_FORMATS = ["parquet", "arrow"]
+
+# Column names and types of flattened results, by table name.
+TABLES = OrderedDict(
+    # `explore dashboards`, one row per dashboard and data source.
+    dashboards=OrderedDict(
+        dashboard_uid="VARCHAR",
+        dashboard_title="VARCHAR",
+        dashboard_path="VARCHAR",
+        dashboard_url="VARCHAR",
+        datasource_uid="VARCHAR",
+        datasource_name="VARCHAR",
+        datasource_type="VARCHAR",
+        datasource_url="VARCHAR",
+        missing="BOOLEAN",
+    ),
+    # `explore dashboards --data-details`, one row per panel target, annotation,
+    # or template variable.
+    dashboard_details=OrderedDict(
+        dashboard_uid="VARCHAR",
+        dashboard_title="VARCHAR",
+        dashboard_url="VARCHAR",
+        section="VARCHAR",
+        panel_id="BIGINT",
+        panel_title="VARCHAR",
+        panel_type="VARCHAR",
+        datasource="JSON",
+        detail="JSON",
+    ),
+    # `explore datasources`, one row per data source and dashboard.
+    datasources=OrderedDict(
+        datasource_uid="VARCHAR",
+        datasource_name="VARCHAR",
+        datasource_type="VARCHAR",
+        datasource_url="VARCHAR",
+        used="BOOLEAN",
+        dashboard_uid="VARCHAR",
+        dashboard_title="VARCHAR",
+        dashboard_path="VARCHAR",
+        dashboard_url="VARCHAR",
+    ),
+    # `log`, one row per dashboard version.
+    versions=OrderedDict(
+        version="BIGINT",
+        datetime="TIMESTAMPTZ",
+        user="VARCHAR",
+        message="VARCHAR",
+        folder="VARCHAR",
+        title="VARCHAR",
+        url="VARCHAR",
+        id="BIGINT",
+        uid="VARCHAR",
+    ),
+    # `find`, one row per match, see `Catalog.match_records`.
+    matches=Catalog.schema["matches"],
+)
+
+
+def output_table(output_format: str, path: str, table: str, records: t.Iterable[trecord]):
+    """
+    Write flattened results to file, in Parquet or Arrow IPC format.
+
+    :param output_format: One of `COLUMNAR_FORMATS`.
+    :param path: Path to output file.
+    :param table: Name of table, see `TABLES`.
+    :param records: Flattened results in "records" shape.
+    """
+    connection = connect()
+    try:
+        with records_source(records, columns=TABLES[table], name=table) as source:
+            # The source is a table function built by `records_source` from quoted literals.
+            expression = f"SELECT * FROM {source}"  # noqa: S608
+            if output_format == "parquet":
+                connection.execute(
+                    f"COPY ({expression}) TO {quote_string(str(path))} (FORMAT parquet)"
+                )
+            elif output_format == "arrow":
+                write_arrow(connection, expression, path)
+            else:
+                raise ValueError(f'Unknown columnar output format "{output_format}"')
+    finally:
+        connection.close()
+
+
+def write_arrow(connection, expression: str, path: str):
+    """
+    Write results of SQL expression to file in Arrow IPC format, batch by batch.
+    """
+    import pyarrow.ipc
+
+    reader = connection.execute(expression).fetch_record_batch(BATCH_SIZE)
+    with pyarrow.ipc.new_file(str(path), reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+def dashboard_records(results: t.Iterable) -> t.Iterator[trecord]:
+    """
+    Flatten results of `explore dashboards`, see `GrafanaWtf.explore_dashboards`.
+    """
+    for result in results:
+        dashboard = OrderedDict(
+            (f"dashboard_{key}", result["dashboard"].get(key))
+            for key in ["uid", "title", "path", "url"]
+        )
+        datasources = [(datasource, False) for datasource in result.get("datasources") or []]
+        for datasource in result.get("datasources_missing") or []:
+            datasources.append((datasource, True))
+        if not datasources:
+            yield dashboard
+        for datasource, missing in datasources:
+            record = OrderedDict(dashboard)
+            for key in ["uid", "name", "type", "url"]:
+                record[f"datasource_{key}"] = datasource.get(key)
+            record["missing"] = missing
+            yield record
+
+
+def dashboard_detail_records(results: t.Iterable) -> t.Iterator[trecord]:
+    """
+    Flatten results of `explore dashboards --data-details`.
+    """
+    for result in results:
+        dashboard = OrderedDict(
+            (f"dashboard_{key}", result["dashboard"].get(key)) for key in ["uid", "title", "url"]
+        )
+        for section in ["panels", "annotations", "templating"]:
+            for item in result["details"].get(section) or []:
+                record = OrderedDict(dashboard)
+                record["section"] = section
+                panel = item.get("_panel") or {}
+                for key in ["id", "title", "type"]:
+                    record[f"panel_{key}"] = panel.get(key)
+                record["datasource"] = item.get("datasource")
+                record["detail"] = {key: value for key, value in item.items() if key != "_panel"}
+                yield record
+
+
+def datasource_records(results: t.Mapping) -> t.Iterator[trecord]:
+    """
+    Flatten results of `explore datasources`, see `GrafanaWtf.explore_datasources`.
+    """
+    for used, items in [(True, results["used"]), (False, results["unused"])]:
+        for item in items:
+            datasource = OrderedDict(
+                (f"datasource_{key}", item["datasource"].get(key))
+                for key in ["uid", "name", "type", "url"]
+            )
+            datasource["used"] = used
+            if not item.get("dashboards"):
+                yield datasource
+            for dashboard in item.get("dashboards") or []:
+                record = OrderedDict(datasource)
+                for key in ["uid", "title", "path", "url"]:
+                    record[f"dashboard_{key}"] = dashboard.get(key)
+                yield record
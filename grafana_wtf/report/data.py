@@ -1,22 +1,66 @@
-import json
 import logging
+import sys
 from collections import OrderedDict
-from typing import List
+from collections.abc import Mapping
+from typing import Iterable, List
 
+from grafana_wtf.codec import json_dumps, json_dumps_compact
 from grafana_wtf.report.tabular import TabularSearchReport
 from grafana_wtf.util import yaml_dump
 
 log = logging.getLogger(__name__)
 
+# Number of NDJSON records to write before flushing the output stream.
+FLUSH_INTERVAL = 100
+
 
 def output_results(output_format: str, results: List):
+    if output_format == "ndjson":
+        output_records(results)
+        return
+    if output_format == "yaml":
+        # Write items of lists as soon as they are serialized.
+        yaml_dump(results, stream=sys.stdout)
+        sys.stdout.write("\n")
+        return
     output = serialize_results(output_format, results)
     print(output)
 
 
+def output_records(records: Iterable):
+    """
+    Output records in NDJSON format, one compact JSON document per line.
+
+    Records are written as soon as they are produced, and the output is flushed
+    every `FLUSH_INTERVAL` records, so consumers can start processing them early.
+    A mapping is written as a single record.
+
+    - https://github.com/ndjson/ndjson-spec
+    """
+    if isinstance(records, Mapping):
+        records = [records]
+    for count, record in enumerate(records, start=1):
+        sys.stdout.write(json_dumps_compact(record) + "\n")
+        if count % FLUSH_INTERVAL == 0:
+            sys.stdout.flush()
+    sys.stdout.flush()
+
+
+def output_catalog_query(output_format: str, catalog, expression: str):
+    """
+    Query catalog of Grafana entities per SQL, and output the results.
+    """
+    log.info(f"Querying catalog with SQL expression: {expression}")
+    try:
+        results = catalog.query(expression)
+    finally:
+        catalog.close()
+    output_results(output_format, results)
+
+
 def serialize_results(output_format: str, results: List):
     if output_format == "json":
-        output = json.dumps(results, indent=4)
+        output = json_dumps(results, indent=4)
 
     elif output_format == "yaml":
         output = yaml_dump(results)
@@ -60,3 +104,21 @@ class DataSearchReport(TabularSearchReport):
             ),
         )
         output_results(self.format, output)
+
+    def display_stream(self, expression, items):
+        """
+        Output search results one by one, in NDJSON format.
+
+        :param items: `(kind, item)` tuples, as generated by `GrafanaWtf.iter_search`.
+        """
+        expression = expression or "*"
+        log.info(f"Searching for expression '{expression}' at Grafana instance {self.grafana_url}")
+
+        labels = {"datasources": "Datasource", "dashboards": "Dashboard"}
+        callbacks = {
+            "datasources": self.compute_url_datasource,
+            "dashboards": self.compute_url_dashboard,
+        }
+        output_records(
+            self.get_output_items(labels[kind], [item], callbacks[kind])[0] for kind, item in items
+        )
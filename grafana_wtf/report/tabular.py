@@ -1,10 +1,9 @@
 import os
 from collections import OrderedDict
 
-from jsonpath_rw import parse
-from munch import Munch
 from tabulate import tabulate
 
+from grafana_wtf.model import DashboardDetails
 from grafana_wtf.report.textual import TextualSearchReport
 
 
@@ -59,24 +58,11 @@ class TabularSearchReport(TextualSearchReport):
         bibdata.update(kwargs)
         return bibdata
 
-    def get_datasources(self, item):
-        # Query datasources.
-        _finder = parse("$..datasource")
-        _datasources = _finder.find(item)
-
-        # Compute unique list of datasources.
-        datasources = []
-        for _ds in _datasources:
-            if not _ds.value:
-                continue
-            if isinstance(_ds.value, Munch):
-                value = dict(_ds.value)
-            else:
-                value = str(_ds.value)
-            if value not in datasources:
-                datasources.append(value)
-
-        return datasources
+    @staticmethod
+    def get_datasources(item):
+        # Search results of dashboards carry their details, see `GrafanaWtf.iter_search`.
+        details = item.meta.get("details") or DashboardDetails(dashboard=item.data)
+        return details.datasource_references
 
 
 class TabularEditHistoryReport:
@@ -2,8 +2,10 @@
 # (c) 2019-2021 Andreas Motl <andreas@hiveeyes.org>
 # License: GNU Affero General Public License, Version 3
 import logging
+import sys
 import textwrap
 from collections import OrderedDict
+from typing import List
 from urllib.parse import urljoin
 
 import colored
@@ -31,79 +33,83 @@ class TextualSearchReport:
     def output_items(self, label, items, url_callback):
         # Output section name (data source vs. dashboard).
         hits = len(items)
-        print("=" * 42)
-        print(f"{_s(label)}: {_m(hits)} hits.")
-        print("=" * 42)
-        print()
+        self.write(["=" * 42, f"{_s(label)}: {_m(hits)} hits.", "=" * 42, ""])
 
-        # Iterate all items having matches.
+        # Iterate all items having matches, writing the output of each item at once.
         for item in items:
-            # print('item:', item)
-
-            if self.verbose:
-                print()
-                print(prettify_json(item.data))
-
-            # Output match title / entity name.
-            name = self.get_item_name(item)
-            section = f"{_s(label)[:-1]} »{name}«"
-            print(_ssb(section))
-            print("=" * len(section))
-
-            # Compute some URLs
-            url = url_callback(item)
-            urls = {
-                "Dashboard": _v(url),
-                "Variables": _v(url + "?editview=templating"),
-            }
-
-            # Output baseline bibliographic data.
-            print()
-            bibdata_output = self.get_bibdata_dashboard(item, **urls)
-            if bibdata_output:
-                print(bibdata_output)
-
-            # Separate matches into "dashboard"- and "panels"-groups.
-            dashboard_matches = []
-            panel_matches = []
-            if "matches" in item.meta:
-                # print(' ', self.format_where(item))
-                for match in item.meta.matches:
-                    panel = self.get_panel(match)
-                    if panel is not None:
-                        panel_matches.append((match, panel))
-                    else:
-                        dashboard_matches.append(match)
-
-            # Output dashboard matches.
-            print()
-            subsection = "Global"
-            print(_ss(subsection))
-            print("-" * len(subsection))
-            for match in dashboard_matches:
-                match_text = f"- {self.format_match(match)}"
-                print(match_text)
-
-            # Output panel bibdata with matches.
-            seen = {}
-            for match, panel in panel_matches:
-                if panel.id not in seen:
-                    seen[panel.id] = True
-                    print()
-
-                    title = self.get_panel_title(panel)
-                    subsection = f"Panel »{title}«"
-                    print(_ss(subsection))
-                    print("-" * len(subsection))
-
-                    print(self.get_bibdata_panel(panel, url))
-                    print("      Matches")
-
-                match_text = f"- {self.format_match(match)}"
-                print(textwrap.indent(match_text, " " * 14))
-
-            print()
-            print()
+            self.write(self.render_item(label, item, url_callback))
+
+    @staticmethod
+    def write(lines: List[str]):
+        sys.stdout.write("".join(line + "\n" for line in lines))
+
+    def render_item(self, label, item, url_callback) -> List[str]:
+        """
+        Render output lines for a single item having matches.
+        """
+        lines = []
+
+        if self.verbose:
+            lines.append("")
+            lines.append(prettify_json(item.data))
+
+        # Output match title / entity name.
+        name = self.get_item_name(item)
+        section = f"{_s(label)[:-1]} »{name}«"
+        lines.append(_ssb(section))
+        lines.append("=" * len(section))
+
+        # Compute some URLs
+        url = url_callback(item)
+        urls = {
+            "Dashboard": _v(url),
+            "Variables": _v(url + "?editview=templating"),
+        }
+
+        # Output baseline bibliographic data.
+        lines.append("")
+        bibdata_output = self.get_bibdata_dashboard(item, **urls)
+        if bibdata_output:
+            lines.append(bibdata_output)
+
+        # Separate matches into "dashboard"- and "panels"-groups,
+        # grouping panel matches by panel.
+        dashboard_matches = []
+        panel_matches = OrderedDict()
+        if "matches" in item.meta:
+            # `get_panels` returns exactly one panel per match.
+            for match, panel in zip(item.meta.matches, self.get_panels(item.meta.matches)):  # noqa: B905
+                if panel is not None:
+                    panel_matches.setdefault(panel.id, (panel, []))[1].append(match)
+                else:
+                    dashboard_matches.append(match)
+
+        # Output dashboard matches.
+        lines.append("")
+        subsection = "Global"
+        lines.append(_ss(subsection))
+        lines.append("-" * len(subsection))
+        for match in dashboard_matches:
+            lines.append(f"- {self.format_match(match)}")
+
+        # Output panel bibdata with matches.
+        for panel, matches in panel_matches.values():
+            lines.append("")
+
+            title = self.get_panel_title(panel)
+            subsection = f"Panel »{title}«"
+            lines.append(_ss(subsection))
+            lines.append("-" * len(subsection))
+
+            lines.append(self.get_bibdata_panel(panel, url))
+            lines.append("      Matches")
+
+            for match in matches:
+                lines.append(textwrap.indent(f"- {self.format_match(match)}", " " * 14))
+
+        lines.append("")
+        lines.append("")
+        return lines
 
     @staticmethod
     def format_match(match):
@@ -115,14 +121,36 @@ class TextualSearchReport:
         """
         Find panel from jsonpath node.
         """
-        while node:
-            last_node = node
-            node = node.context
-            if node is None:
-                break
-            if str(node.path) == "panels":
-                return last_node.value
-        return None
+        return self.get_panels([node])[0]
+
+    @staticmethod
+    def get_panels(nodes):
+        """
+        Find panels from many jsonpath nodes at once.
+
+        The panel of a node is the value of its closest ancestor, or itself, which
+        is an item of a "panels" list. Nodes found by the same search often share
+        ancestors, so the panel of each ancestor is only resolved once.
+        """
+        panel_by_node = {}
+        panels = []
+        for node in nodes:
+            visited = []
+            panel = None
+            while node is not None:
+                if id(node) in panel_by_node:
+                    panel = panel_by_node[id(node)]
+                    break
+                visited.append(id(node))
+                parent = node.context
+                if parent is not None and str(parent.path) == "panels":
+                    panel = node.value
+                    break
+                node = parent
+            for key in visited:
+                panel_by_node[key] = panel
+            panels.append(panel)
+        return panels
 
     def get_bibdata_panel(self, panel, baseurl, **kwargs):
         """
@@ -197,27 +225,31 @@ subsection_style = colored.fg("magenta")
 key_style = colored.fg("blue") + bold_style
 match_style = colored.fg("yellow") + bold_style
 value_style = colored.fg("white") + bold_style
+subsection_bold_style = subsection_style + bold_style
+
+# Compute the reset sequence once, instead of per invocation of `colored.stylize`.
+reset_style = colored.attr("reset")
 
 
 def _s(text):
-    return colored.stylize(str(text), section_style)
+    return f"{section_style}{text}{reset_style}"
 
 
 def _ss(text):
-    return colored.stylize(str(text), subsection_style)
+    return f"{subsection_style}{text}{reset_style}"
 
 
 def _ssb(text):
-    return colored.stylize(str(text), subsection_style + bold_style)
+    return f"{subsection_bold_style}{text}{reset_style}"
 
 
 def _k(text):
-    return colored.stylize(str(text), key_style)
+    return f"{key_style}{text}{reset_style}"
 
 
 def _m(text):
-    return colored.stylize(str(text), match_style)
+    return f"{match_style}{text}{reset_style}"
 
 
 def _v(text):
-    return colored.stylize(str(text), value_style)
+    return f"{value_style}{text}{reset_style}"
@@ -0,0 +1,152 @@
+"""
+Query data per SQL, using DuckDB.
+
+Data in "records" shape is loaded into a private DuckDB connection using its
+native JSON reader, and results are fetched in batches of rows.
+
+- https://duckdb.org/
+- https://duckdb.org/docs/data/json/overview
+"""
+
+import contextlib
+import tempfile
+import typing as t
+from pathlib import Path
+
+from grafana_wtf.codec import json_dumps_compact
+
+trecord = t.Dict[str, t.Any]
+
+# How many rows to fetch at once when streaming results.
+BATCH_SIZE = 10_000
+
+
+def connect(database: str = ":memory:", read_only: bool = False):
+    import duckdb
+
+    return duckdb.connect(database, read_only=read_only)
+
+
+class ColumnTypes:
+    """
+    Derive DuckDB column types from data in "records" shape.
+
+    Columns are ordered by their first appearance. Columns with nested values,
+    or with values of different types, use the `JSON` type.
+    """
+
+    def __init__(self):
+        self.types: t.Dict[str, t.Set[str]] = {}
+
+    def add(self, record: trecord):
+        for key, value in record.items():
+            types = self.types.setdefault(key, set())
+            if value is not None:
+                types.add(self.type_of(value))
+
+    @staticmethod
+    def type_of(value: t.Any) -> str:
+        if isinstance(value, bool):
+            return "BOOLEAN"
+        if isinstance(value, int):
+            return "BIGINT"
+        if isinstance(value, float):
+            return "DOUBLE"
+        if isinstance(value, str):
+            return "VARCHAR"
+        return "JSON"
+
+    def columns(self) -> t.Dict[str, str]:
+        columns = {}
+        for key, types in self.types.items():
+            if not types:
+                columns[key] = "VARCHAR"
+            elif len(types) == 1:
+                columns[key] = next(iter(types))
+            elif types == {"BIGINT", "DOUBLE"}:
+                columns[key] = "DOUBLE"
+            else:
+                columns[key] = "JSON"
+        return columns
+
+
+def load_records(
+    connection,
+    table_name: str,
+    records: t.Iterable[trecord],
+    columns: t.Optional[t.Dict[str, str]] = None,
+):
+    """
+    Load data in "records" shape into a DuckDB table, using DuckDB's JSON reader.
+
+    :param connection: DuckDB connection
+    :param table_name: Name of the table to create
+    :param records: Data in "records" shape, aka. iterable of dictionaries
+    :param columns: Column names and types. By default, they are derived from the data.
+    """
+    with records_source(records, columns=columns, name=table_name) as source:
+        # Identifiers can not be bound as parameters. The table name is quoted,
+        # and the source is a table function built from quoted literals.
+        connection.execute(
+            f"CREATE OR REPLACE TABLE {quote_identifier(table_name)} AS SELECT * FROM {source}"  # noqa: S608
+        )
+
+
+@contextlib.contextmanager
+def records_source(
+    records: t.Iterable[trecord],
+    columns: t.Optional[t.Dict[str, str]] = None,
+    name: str = "records",
+) -> t.Iterator[str]:
+    """
+    Provide data in "records" shape as SQL table function, using DuckDB's JSON reader.
+
+    Records are written to a temporary newline-delimited JSON file, deriving the
+    column types on the way, so they are neither copied nor converted otherwise.
+    The file is removed when leaving the context.
+
+    :param records: Data in "records" shape, aka. iterable of dictionaries
+    :param columns: Column names and types. By default, they are derived from the data.
+    :param name: Name of the data, for error messages.
+    """
+    types = ColumnTypes()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "records.ndjson"
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                types.add(record)
+                f.write(json_dumps_compact(record))
+                f.write("\n")
+        columns = columns or types.columns()
+        if not columns:
+            raise ValueError(f"Unable to create table {name} without any columns")
+        spec = ", ".join(
+            f"{quote_string(column)}: {quote_string(type_)}" for column, type_ in columns.items()
+        )
+        yield (
+            f"read_json({quote_string(str(path))}, format='newline_delimited', columns={{{spec}}})"
+        )
+
+
+def query(connection, expression: str) -> t.Iterator[trecord]:
+    """
+    Run SQL expression, and stream results in "records" shape.
+    """
+    result = connection.execute(expression)
+    if result.description is None:
+        return
+    names = [column[0] for column in result.description]
+    while True:
+        rows = result.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            yield {name: row[index] for index, name in enumerate(names)}
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
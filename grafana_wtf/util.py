@@ -1,19 +1,16 @@
 # -*- coding: utf-8 -*-
 # (c) 2019-2021 Andreas Motl <andreas@hiveeyes.org>
 # License: GNU Affero General Public License, Version 3
+import functools
 import io
-import json
 import logging
+import re
 import sys
 import typing as t
 from collections import OrderedDict
+from datetime import datetime, timezone
 
-import yaml
-from jsonpath_rw import parse
-from munch import munchify
-from pygments import highlight
-from pygments.formatters import TerminalFormatter
-from pygments.lexers import JsonLexer
+from grafana_wtf.codec import json_dumps, json_dumps_compact
 
 log = logging.getLogger(__name__)
 
@@ -39,6 +36,8 @@ def configure_http_logging(options):
 
 
 def normalize_options(options):
+    from munch import munchify
+
     normalized = {}
     for key, value in options.items():
         # Add primary variant.
@@ -63,16 +62,28 @@ def read_list(data, separator=","):
 
 class JsonPathFinder:
     def __init__(self):
+        from jsonpath_rw import parse
+
         self.jsonpath_expr = parse("$..*")
         self.non_leaf_nodes = ("rows", "panels", "targets", "tags", "groupBy", "list", "links")
         self.scalars = (str, int, float, list)
 
-    def find(self, needle, haystack):
+    def find(self, needle, haystack, text=None):
+        """
+        Find all nodes within `haystack` whose values contain `needle`.
+
+        `text` is the serialized JSON representation of `haystack`, see
+        `to_json_text`. When given, it will be reused for quickly rejecting
+        documents which do not contain the needle at all.
+        """
         matches = []
 
         # Fast search whether needle is in haystack at all.
-        if needle not in str(haystack):
-            return matches
+        if json_text_searchable(needle):
+            if text is None:
+                text = to_json_text(haystack)
+            if json_escape(needle) not in text:
+                return matches
 
         # Iterate JSON, node by node, to find out about
         # where in the JSON document the needle is located.
@@ -102,18 +113,236 @@ class JsonPathFinder:
 
         return matches
 
+    def replace(self, needle, replacement, haystack, text=None, scope=None):
+        """
+        Replace `needle` by `replacement` within all string values of `haystack`.
+
+        Only string values are rewritten, keys and other data types are left
+        untouched. The document is not modified in place, only the containers
+        leading to modified values are copied.
+
+        When given, `scope` is a parsed JSONPath expression selecting the
+        subtrees where replacements will be applied.
+
+        :return: Tuple of new document and number of replaced values.
+        """
+
+        # Fast search whether needle is in haystack at all.
+        if text is None:
+            text = to_json_text(haystack)
+        if json_escape(needle) not in text:
+            return haystack, 0
+
+        def replace_value(value):
+            return replace_strings(value, needle, replacement)
+
+        if scope is None:
+            return replace_value(haystack)
+
+        # Apply replacements to selected subtrees, skipping nested ones.
+        paths = sorted(jsonpath_keys(node.full_path) for node in scope.find(haystack))
+        count = 0
+        done = []
+        for path in paths:
+            if any(path[: len(prefix)] == prefix for prefix in done):
+                continue
+            done.append(path)
+            haystack, replaced = update_path(haystack, path, replace_value)
+            count += replaced
+        return haystack, count
+
+
+def replace_strings(value, needle: str, replacement: str):
+    """
+    Replace `needle` within all string values of a nested structure, copy-on-write.
+
+    :return: Tuple of new value and number of replaced values.
+    """
+    if isinstance(value, str):
+        if needle in value:
+            return value.replace(needle, replacement), 1
+        return value, 0
+    if isinstance(value, dict):
+        result = value
+        count = 0
+        for key, item in value.items():
+            new_item, replaced = replace_strings(item, needle, replacement)
+            if replaced:
+                if result is value:
+                    result = type(value)(value)
+                result[key] = new_item
+                count += replaced
+        return result, count
+    if isinstance(value, list):
+        result = value
+        count = 0
+        for index, item in enumerate(value):
+            new_item, replaced = replace_strings(item, needle, replacement)
+            if replaced:
+                if result is value:
+                    result = list(value)
+                result[index] = new_item
+                count += replaced
+        return result, count
+    return value, 0
+
+
+def update_path(data, path: t.List, func):
+    """
+    Apply `func` to the value at `path` within a nested structure, copy-on-write.
+
+    `func` returns a tuple of new value and number of changes.
+    """
+    if not path:
+        return func(data)
+    key = path[0]
+    new_item, count = update_path(data[key], path[1:], func)
+    if count:
+        data = type(data)(data)
+        data[key] = new_item
+    return data, count
+
+
+def jsonpath_keys(path) -> t.List:
+    """
+    Decompose a JSONPath, as found on `DatumInContext.full_path`, into keys and indexes.
+    """
+    from jsonpath_rw.jsonpath import Child, Fields, Index, Root, This
+
+    if isinstance(path, Child):
+        return jsonpath_keys(path.left) + jsonpath_keys(path.right)
+    if isinstance(path, Fields) and len(path.fields) == 1:
+        return [path.fields[0]]
+    if isinstance(path, Index):
+        return [path.index]
+    if isinstance(path, (Root, This)):
+        return []
+    raise TypeError(f"Unable to decompose JSONPath: {path}")
+
+
+def to_json_text(data, sort_keys: bool = True) -> str:
+    """
+    Serialize data into its canonical JSON text representation.
+
+    Use `sort_keys=False` in order to retain the order of mapping keys.
+    """
+    return json_dumps_compact(data, sort_keys=sort_keys)
+
+
+# Characters which can occur in `str()` of non-string values, outside of quoted
+# strings, for example `True`, `None`, `1e+16`, `nan`, or `[1, Munch({...})]`.
+NON_STRING_CHARACTERS = frozenset("0123456789+-.e[](){},: TrueFalseNoneinfDefaultMunch")
+
+
+def json_text_searchable(needle: str) -> bool:
+    """
+    Whether searching the JSON text representation for `needle` can not miss a match.
+
+    Values are matched by their `str()` representation, see `JsonPathFinder.find`.
+    For strings, the JSON text contains the escaped needle whenever the value
+    contains the needle. For other values, the representations differ, like
+    `True` vs. `true`, `1e-05` vs. `0.00001`, or `['a', 'b']` vs. `["a","b"]`.
+
+    A needle is safe when it consists of printable ASCII characters without
+    quotes and backslashes, and contains at least one character which can only
+    occur within strings. Then, it can only match within the contents of a string,
+    even when the string is an item of a list.
+    """
+    return (
+        isinstance(needle, str)
+        and all(" " <= char <= "~" and char not in "\"'\\" for char in needle)
+        and not NON_STRING_CHARACTERS.issuperset(needle)
+    )
+
+
+def json_escape(text: str) -> str:
+    """
+    Escape text like it is represented within the output of `to_json_text`.
+    """
+    return json_dumps_compact(text)[1:-1]
+
 
 def prettify_json(data):
-    json_str = json.dumps(data, indent=4)
+    from pygments import highlight
+    from pygments.formatters import TerminalFormatter
+    from pygments.lexers import JsonLexer
+
+    json_str = json_dumps(data, indent=4)
     return highlight(json_str, JsonLexer(), TerminalFormatter())
 
 
-def yaml_dump(data, stream=None, Dumper=yaml.SafeDumper, **kwds):
+def yaml_dump(data, stream=None, Dumper=None, **kwds):
     """
+    Serialize data to YAML, retaining the order of `OrderedDict` mappings.
+
+    Items of lists are represented and emitted one by one, so they are
+    written to `stream` right away, without building the representation
+    of the whole list. Objects shared between items are therefore repeated,
+    instead of being referenced by aliases. When `stream` is not given,
+    return a string.
+
     https://stackoverflow.com/questions/5121931/in-python-how-can-you-load-yaml-mappings-as-ordereddicts
     """
+    import yaml
+    from yaml.events import (
+        DocumentEndEvent,
+        DocumentStartEvent,
+        SequenceEndEvent,
+        SequenceStartEvent,
+    )
+
+    # libyaml does not write the document end marker `...` after top-level
+    # plain scalars, so use the pure-Python emitter for them.
+    if Dumper is None and not isinstance(data, (dict, list)):
+        Dumper = yaml.SafeDumper
+
+    output = None
+    if stream is None:
+        stream = output = io.BytesIO() if kwds.get("encoding") else io.StringIO()
 
     kwds["default_flow_style"] = False
+    dumper = yaml_ordered_dumper(Dumper)(stream, **kwds)
+    try:
+        dumper.open()
+        if isinstance(data, list):
+            dumper.emit(
+                DocumentStartEvent(
+                    explicit=kwds.get("explicit_start"),
+                    version=kwds.get("version"),
+                    tags=kwds.get("tags"),
+                )
+            )
+            dumper.emit(SequenceStartEvent(None, None, True, flow_style=False))
+            serializer = yaml_item_serializer()(dumper)
+            for item in data:
+                serializer.serialize_item(dumper.represent_data(item))
+                dumper.represented_objects = {}
+                dumper.object_keeper = []
+                dumper.alias_key = None
+            dumper.emit(SequenceEndEvent())
+            dumper.emit(DocumentEndEvent(explicit=kwds.get("explicit_end")))
+        else:
+            dumper.represent(data)
+        dumper.close()
+    finally:
+        dumper.dispose()
+
+    if output is not None:
+        return output.getvalue()
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_ordered_dumper(Dumper=None):
+    """
+    Create YAML dumper class retaining the order of `OrderedDict` mappings, once per base class.
+
+    By default, use the libyaml-based `CSafeDumper`, falling back to `SafeDumper`.
+    """
+    import yaml
+
+    if Dumper is None:
+        Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
     class OrderedDumper(Dumper):
         pass
@@ -124,7 +353,37 @@ def yaml_dump(data, stream=None, Dumper=yaml.SafeDumper, **kwds):
         )
 
     OrderedDumper.add_representer(OrderedDict, _dict_representer)
-    return yaml.dump(data, stream, OrderedDumper, **kwds)
+    return OrderedDumper
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_item_serializer():
+    """
+    Create serializer class for emitting representations of list items one by one.
+    """
+    from yaml.serializer import Serializer
+
+    class ItemSerializer(Serializer):
+        """
+        Serialize nodes into the emitter of a YAML dumper, as items of a sequence.
+
+        Anchors are numbered across all items, so they are unique within the document.
+        """
+
+        def __init__(self, dumper):
+            self.emit = dumper.emit
+            self.resolve = dumper.resolve
+            self.descend_resolver = dumper.descend_resolver
+            self.ascend_resolver = dumper.ascend_resolver
+            self.last_anchor_id = 0
+
+        def serialize_item(self, node):
+            self.serialized_nodes = {}
+            self.anchors = {}
+            self.anchor_node(node)
+            self.serialize_node(node, None, None)
+
+    return ItemSerializer
 
 
 def as_bool(value: str) -> bool:
@@ -170,6 +429,38 @@ def format_dict(data) -> str:
     return output.read().rstrip()
 
 
+def canonical_key(value):
+    """
+    Compute a hashable key for nested data, to be used for deduplication.
+
+    Mappings compare equal regardless of their type and key order, like
+    `dict.__eq__`.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, canonical_key(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(canonical_key(item) for item in value)
+    return value
+
+
+def parse_timestamp(value: t.Optional[str]) -> t.Optional[datetime]:
+    """
+    Parse RFC 3339 timestamp like used by Grafana, returning `None` if that is not possible.
+    """
+    if not value:
+        return None
+    # Python < 3.11 does not understand the `Z` suffix, and needs fractions of exactly six digits.
+    value = value.replace("Z", "+00:00")
+    value = re.sub(r"\.(\d+)", lambda match: "." + match.group(1)[:6].ljust(6, "0"), value)
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
 def to_list(value):
     if not isinstance(value, list):
         value = [value]
@@ -181,10 +472,9 @@ trecord = t.List[t.Dict[str, str]]
 
 def filter_with_sql(data: trecord, view_name: str, expression: str) -> trecord:
     """
-    Filter data in "records" shape by SQL expression, using pandas and DuckDB.
+    Filter data in "records" shape by SQL expression, using DuckDB.
 
     - https://duckdb.org/
-    - https://pandas.pydata.org/
 
     Example::
 
@@ -198,10 +488,11 @@ def filter_with_sql(data: trecord, view_name: str, expression: str) -> trecord:
     :param view_name: View name the data is registered at, when querying per SQL.
     :return:
     """
-    import duckdb
-    import pandas as pd
+    from grafana_wtf.sql import connect, load_records, query
 
-    frame = pd.DataFrame.from_records(data)
-    duckdb.register(view_name, frame)
-    results = duckdb.sql(expression)
-    return results.to_df().to_dict(orient="records")
+    connection = connect()
+    try:
+        load_records(connection, view_name, data)
+        return list(query(connection, expression))
+    finally:
+        connection.close()
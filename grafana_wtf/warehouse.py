@@ -0,0 +1,188 @@
+"""
+Persistent DuckDB database of Grafana entities, for analyzing them offline.
+
+The warehouse uses the same tables like the catalog, see `grafana_wtf.catalog`,
+with an additional `instance` column, so it can keep multiple Grafana instances.
+The edit history of dashboards is stored into the `dashboard_versions` table.
+"""
+
+import logging
+import typing as t
+from collections import OrderedDict
+
+from grafana_wtf.catalog import Catalog
+from grafana_wtf.model import dashboard_uid, dashboard_version
+from grafana_wtf.sql import connect, load_records, query, quote_identifier
+
+log = logging.getLogger(__name__)
+
+
+class Warehouse:
+    """
+    Synchronize Grafana entities into a DuckDB database file, and query it.
+
+    Dashboards are upserted by uid, when their version changed, along with
+    their panels, targets and data sources. Dashboard versions are appended
+    by uid and version. Data sources, folders and users are replaced.
+    """
+
+    # Tables keyed by dashboard uid.
+    dashboard_tables = OrderedDict(
+        dashboards="uid",
+        panels="dashboard_uid",
+        targets="dashboard_uid",
+        dashboard_datasources="dashboard_uid",
+    )
+
+    # Tables replaced completely.
+    entity_tables = ["datasources", "folders", "users"]
+
+    versions_columns = OrderedDict(
+        uid="VARCHAR",
+        version="BIGINT",
+        datetime="VARCHAR",
+        user="VARCHAR",
+        message="VARCHAR",
+        folder="VARCHAR",
+        title="VARCHAR",
+        url="VARCHAR",
+        id="BIGINT",
+    )
+
+    primary_keys = {
+        "dashboards": ["uid"],
+        "dashboard_versions": ["uid", "version"],
+    }
+
+    # Prefix for names of tables used for staging data while synchronizing.
+    staging_prefix = "staging_"
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.connection = connect(str(path), read_only=read_only)
+        if not read_only:
+            self.setup()
+
+    @property
+    def schema(self) -> t.Dict[str, t.Dict[str, str]]:
+        schema = OrderedDict(
+            (name, columns) for name, columns in Catalog.schema.items() if name != "matches"
+        )
+        schema["dashboard_versions"] = self.versions_columns
+        return schema
+
+    def setup(self):
+        for name, columns in self.schema.items():
+            definitions = ["instance VARCHAR NOT NULL"] + [
+                f"{quote_identifier(column)} {type_}" for column, type_ in columns.items()
+            ]
+            if name in self.primary_keys:
+                keys = ", ".join(map(quote_identifier, ["instance"] + self.primary_keys[name]))
+                definitions.append(f"PRIMARY KEY ({keys})")
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote_identifier(name)} ({', '.join(definitions)})"
+            )
+
+    def sync(self, engine) -> t.Dict[str, t.Any]:
+        """
+        Synchronize entities of the Grafana instance into the warehouse.
+        """
+        instance = engine.grafana_url
+        engine.scan_catalog()
+
+        # Determine dashboards which changed since the previous synchronization.
+        known = dict(
+            self.connection.execute(
+                "SELECT uid, version FROM dashboards WHERE instance = ?", [instance]
+            ).fetchall()
+        )
+        dashboards = [
+            dashboard
+            for dashboard in engine.data.dashboards or []
+            if not dashboard["meta"].get("isFolder")
+        ]
+        changed = [
+            dashboard
+            for dashboard in dashboards
+            if dashboard_uid(dashboard) not in known
+            or known[dashboard_uid(dashboard)] != dashboard_version(dashboard)
+        ]
+        removed = sorted(set(known) - set(map(dashboard_uid, dashboards)))
+        log.info(
+            f"Synchronizing {len(changed)} changed and {len(removed)} removed "
+            f"out of {len(dashboards)} dashboard(s)"
+        )
+
+        # Stage records of changed dashboards, and their edit history.
+        catalog = engine.catalog(dashboards=changed, connection=self.connection)
+        catalog.load(prefix=self.staging_prefix)
+        versions = []
+        for dashboard in changed:
+            versions.extend(engine.log_entries(engine.dashboard_summary(dashboard)))
+        load_records(
+            self.connection,
+            self.staging_prefix + "dashboard_versions",
+            versions,
+            columns=self.versions_columns,
+        )
+
+        uids = [dashboard_uid(dashboard) for dashboard in changed] + removed
+        self.connection.begin()
+        try:
+            # Identifiers can not be bound as parameters, so they are quoted
+            # by `quote_identifier`. Values are bound as parameters.
+            for name, key in self.dashboard_tables.items():
+                self.connection.execute(
+                    f"DELETE FROM {quote_identifier(name)} "  # noqa: S608
+                    f"WHERE instance = ? AND list_contains(?, {quote_identifier(key)})",
+                    [instance, uids],
+                )
+                self.insert(name, instance)
+            for name in self.entity_tables:
+                self.connection.execute(
+                    f"DELETE FROM {quote_identifier(name)} WHERE instance = ?",  # noqa: S608
+                    [instance],
+                )
+                self.insert(name, instance)
+            versions_before = self.count("dashboard_versions", instance)
+            self.insert("dashboard_versions", instance, ignore=True)
+            versions_added = self.count("dashboard_versions", instance) - versions_before
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            for name in Catalog.schema.keys() | {"dashboard_versions"}:
+                self.connection.execute(
+                    f"DROP TABLE IF EXISTS {quote_identifier(self.staging_prefix + name)}"
+                )
+
+        return OrderedDict(
+            instance=instance,
+            dashboards=len(dashboards),
+            changed=len(changed),
+            removed=len(removed),
+            versions=versions_added,
+        )
+
+    def insert(self, name: str, instance: str, ignore: bool = False):
+        # Identifiers are quoted, values are bound as parameters.
+        columns = ", ".join(map(quote_identifier, self.schema[name]))
+        self.connection.execute(
+            f"INSERT {'OR IGNORE ' if ignore else ''}INTO {quote_identifier(name)} "  # noqa: S608
+            f"(instance, {columns}) "
+            f"SELECT ?, {columns} FROM {quote_identifier(self.staging_prefix + name)}",
+            [instance],
+        )
+
+    def count(self, name: str, instance: str) -> int:
+        # Identifiers are quoted, values are bound as parameters.
+        return self.connection.execute(
+            f"SELECT COUNT(*) FROM {quote_identifier(name)} WHERE instance = ?",  # noqa: S608
+            [instance],
+        ).fetchone()[0]
+
+    def query(self, expression: str) -> t.List[t.Dict[str, t.Any]]:
+        return list(query(self.connection, expression))
+
+    def close(self):
+        self.connection.close()
@@ -20,7 +20,6 @@ requires = [
     "tqdm>=4.60.0,<5",
     "verlib2>=0.3.1,<0.4",
     # Filtering
-    f"pandas<2.4; {no_linux_on_arm}",
     f"duckdb<1.5; {no_linux_on_arm}",
     # Grafana
     "grafana-client>=4,<6",
@@ -35,12 +34,18 @@ requires = [
 ]
 
 extras = {
+    "arrow": [
+        "pyarrow<25",
+    ],
+    "fast": [
+        "orjson<4",
+    ],
     "test": [
         "pytest<9",
         "pytest-cov<7",
         "lovely-pytest-docker>=1,<2",
         "grafanalib==0.7.1",
-    ]
+    ],
 }
 
 setup(
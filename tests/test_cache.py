@@ -0,0 +1,55 @@
+import time
+
+from munch import munchify
+
+from grafana_wtf.cache import DocumentCache
+
+
+def test_document_cache_roundtrip(tmp_path):
+    cache = DocumentCache(path=tmp_path, namespace="http://localhost:3000")
+    document = munchify({"dashboard": {"uid": "foo", "panels": [{"id": 1}]}})
+    cache.set("dashboard", "foo", document)
+    assert cache.get("dashboard", "foo") == document
+    assert cache.get("dashboard", "foo").dashboard.panels[0].id == 1
+    assert cache.get("dashboard", "bar") is None
+
+
+def test_document_cache_namespace(tmp_path):
+    cache1 = DocumentCache(path=tmp_path, namespace="http://localhost:3000")
+    cache2 = DocumentCache(path=tmp_path, namespace="http://localhost:3001")
+    cache1.set("dashboard", "foo", {"uid": "foo"})
+    assert cache2.get("dashboard", "foo") is None
+
+
+def test_document_cache_expired(tmp_path, monkeypatch):
+    cache = DocumentCache(path=tmp_path, namespace="http://localhost:3000", expire_after=60)
+    cache.set("dashboard", "foo", {"uid": "foo"})
+    assert cache.get("dashboard", "foo") == {"uid": "foo"}
+    monkeypatch.setattr(time, "time", lambda: float("inf"))
+    assert cache.get("dashboard", "foo") is None
+
+
+def test_document_cache_disabled(tmp_path):
+    cache = DocumentCache(path=tmp_path, namespace="http://localhost:3000", expire_after=0)
+    cache.set("dashboard", "foo", {"uid": "foo"})
+    assert cache.get("dashboard", "foo") is None
+    assert not cache.path.exists()
+
+
+def test_document_cache_never_expire(tmp_path, monkeypatch):
+    cache = DocumentCache(path=tmp_path, namespace="http://localhost:3000", expire_after=-1)
+    cache.set("dashboard", "foo", {"uid": "foo"})
+    monkeypatch.setattr(time, "time", lambda: float("inf"))
+    assert cache.get("dashboard", "foo") == {"uid": "foo"}
+
+
+def test_document_cache_delete_and_clear(tmp_path):
+    cache = DocumentCache(path=tmp_path, namespace="http://localhost:3000")
+    cache.set("dashboard", "foo", {"uid": "foo"})
+    cache.set("dashboard", "bar", {"uid": "bar"})
+    cache.delete("dashboard", "foo")
+    cache.delete("dashboard", "unknown")
+    assert cache.get("dashboard", "foo") is None
+    assert cache.get("dashboard", "bar") == {"uid": "bar"}
+    cache.clear()
+    assert cache.get("dashboard", "bar") is None
@@ -0,0 +1,120 @@
+from munch import Munch, munchify
+
+from grafana_wtf.catalog import Catalog
+from grafana_wtf.util import JsonPathFinder
+
+DASHBOARD = munchify(
+    {
+        "meta": {"isFolder": False, "folderUid": "folder1", "url": "/d/dash1/foo"},
+        "dashboard": {
+            "uid": "dash1",
+            "id": 1,
+            "title": "Foo",
+            "version": 3,
+            "panels": [
+                {
+                    "id": 1,
+                    "type": "timeseries",
+                    "datasource": {"uid": "prom1", "type": "prometheus"},
+                    "targets": [{"refId": "A", "expr": "up"}, {"refId": "B", "expr": "down"}],
+                },
+                {
+                    "id": 2,
+                    "type": "row",
+                    "panels": [
+                        {
+                            "id": 3,
+                            "type": "table",
+                            "datasource": "influx",
+                            "targets": [{"refId": "A", "query": "SELECT * FROM ldi_readings"}],
+                        }
+                    ],
+                },
+            ],
+        },
+    }
+)
+
+
+def test_catalog_panels_and_targets():
+    catalog = Catalog()
+    catalog.add_dashboards([DASHBOARD])
+
+    assert catalog.query(
+        "SELECT id, parent_id, datasource_uid, datasource_name FROM panels ORDER BY id"
+    ) == [
+        {"id": 1, "parent_id": None, "datasource_uid": "prom1", "datasource_name": None},
+        {"id": 2, "parent_id": None, "datasource_uid": None, "datasource_name": None},
+        {"id": 3, "parent_id": 2, "datasource_uid": None, "datasource_name": "influx"},
+    ]
+
+    # Targets inherit data sources from their panels.
+    assert catalog.query(
+        """
+        SELECT COALESCE(datasource_type, datasource_name) AS datasource, COUNT(*) AS targets
+        FROM targets
+        GROUP BY datasource
+        ORDER BY datasource
+        """
+    ) == [{"datasource": "influx", "targets": 1}, {"datasource": "prometheus", "targets": 2}]
+
+    # Tables without data are available, too.
+    assert catalog.query("SELECT COUNT(*) AS count FROM users") == [{"count": 0}]
+    catalog.close()
+
+
+def test_catalog_target_datasource():
+    dashboard = munchify(
+        {
+            "meta": {},
+            "dashboard": {
+                "uid": "dash2",
+                "panels": [
+                    {
+                        "id": 1,
+                        "datasource": {"uid": "prom1", "type": "prometheus"},
+                        "targets": [{"refId": "A"}, {"refId": "B", "datasource": "loki"}],
+                    }
+                ],
+            },
+        }
+    )
+    catalog = Catalog()
+    catalog.add_dashboards([dashboard])
+
+    # Targets with their own data source reference do not mix it with the one of the panel.
+    assert catalog.query(
+        """
+        SELECT ref_id, datasource_uid, datasource_name, datasource_type
+        FROM targets
+        ORDER BY ref_id
+        """
+    ) == [
+        {
+            "ref_id": "A",
+            "datasource_uid": "prom1",
+            "datasource_name": None,
+            "datasource_type": "prometheus",
+        },
+        {"ref_id": "B", "datasource_uid": None, "datasource_name": "loki", "datasource_type": None},
+    ]
+    catalog.close()
+
+
+def test_catalog_matches():
+    matches = JsonPathFinder().find("ldi_readings", DASHBOARD)
+    results = Munch(
+        datasources=[],
+        dashboards=[Munch(meta=Munch(matches=matches), data=DASHBOARD)],
+    )
+    catalog = Catalog()
+    catalog.add_matches(results)
+    assert catalog.query("SELECT kind, uid, path, value FROM matches") == [
+        {
+            "kind": "dashboard",
+            "uid": "dash1",
+            "path": "dashboard.panels.[1].panels.[0].targets.[0].query",
+            "value": '"SELECT * FROM ldi_readings"',
+        }
+    ]
+    catalog.close()
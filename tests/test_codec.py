@@ -0,0 +1,50 @@
+import json
+
+import pytest
+from munch import munchify
+
+from grafana_wtf import codec
+
+DATA = munchify(
+    {
+        "meta": {"uid": "foo", "count": 42, "empty": [], "nested": {}},
+        "items": [{"b": 1.5, "a": "ä"}, None, True],
+    }
+)
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(codec, "orjson", None)
+    return request.param
+
+
+def test_json_dumps_indent(backend):
+    data = {"meta": DATA.meta, "items": [{"b": 1.5, "a": "a"}, None, True]}
+    assert codec.json_dumps(data, indent=4) == json.dumps(data, indent=4)
+
+
+def test_json_dumps_non_ascii(backend):
+    data = {"title": "Grüße", "tags": ["naïve", "日本", "🌍"]}
+    assert codec.json_dumps(data, indent=2) == json.dumps(data, indent=2)
+    assert codec.json_dumps(data, indent=4) == json.dumps(data, indent=4)
+
+
+def test_json_dumps_compact(backend):
+    assert codec.json_dumps_compact(DATA, sort_keys=True) == json.dumps(
+        DATA, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+
+
+def test_json_loads(backend):
+    text = codec.json_dumps_compact(DATA)
+    assert codec.json_loads(text) == DATA
+    assert codec.json_loads(text.encode("utf-8")) == DATA
+
+
+def test_json_dumps_fallback(backend):
+    # Integers exceeding 64 bits are not supported by orjson.
+    assert codec.json_dumps({"value": 2**70}) == '{"value": 1180591620717411303424}'
@@ -1,7 +1,9 @@
 import json
 import logging
+import os
 import re
 import shlex
+import subprocess
 import sys
 from unittest import mock
 
@@ -45,6 +47,68 @@ def test_failure_grafana_url_missing():
     )
 
 
+def imported_modules(code: str) -> set:
+    """
+    Run Python code in a subprocess, and return names of all imported modules,
+    using `python -X importtime`.
+    """
+    # Prevent coverage measurement from importing additional modules.
+    env = {key: value for key, value in os.environ.items() if not key.startswith("COV_")}
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=False,
+        env=env,
+    )
+    return {
+        line.split("|")[-1].strip()
+        for line in process.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+# Modules only needed by subcommands talking to Grafana, or producing reports.
+HEAVY_MODULES = [
+    "niquests",
+    "requests_cache",
+    "grafana_client",
+    "munch",
+    "tqdm",
+    "colored",
+    "jsonpath_rw",
+    "tabulate",
+    "pygments",
+    "yaml",
+    "duckdb",
+]
+
+
+def test_importtime_commands():
+    """
+    Importing the command line interface must not import any heavy modules.
+    """
+    modules = imported_modules("import grafana_wtf.commands")
+    assert "grafana_wtf.commands" in modules
+    assert modules.isdisjoint(HEAVY_MODULES)
+
+
+def test_importtime_version():
+    """
+    Displaying the program version must not import any heavy modules.
+    """
+    modules = imported_modules(
+        "import sys; sys.argv = ['grafana-wtf', '--version']\n"
+        "from grafana_wtf.commands import run\n"
+        "try:\n"
+        "    run()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    )
+    assert "docopt" in modules
+    assert modules.isdisjoint(HEAVY_MODULES)
+
+
 def test_find_textual_empty(docker_grafana, capsys):
     # Run command and capture output.
     set_command("find foobar")
@@ -248,6 +312,54 @@ def test_find_format_yaml(ldi_resources, capsys):
         assert all("path" in m for m in dashboard["Matches"])
 
 
+def test_find_format_ndjson(ldi_resources, capsys):
+    # Only provision specific dashboard(s).
+    ldi_resources(
+        dashboards=[
+            "tests/grafana/dashboards/ldi-v27.json",
+            "tests/grafana/dashboards/ldi-v33.json",
+        ]
+    )
+
+    # Run command and capture output.
+    set_command("find ldi_readings --format=ndjson")
+    grafana_wtf.commands.run()
+    captured = capsys.readouterr()
+
+    # Verify output.
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    dashboards = [record for record in records if record["Type"] == "Dashboard"]
+    assert len(dashboards) == 2
+    for dashboard in dashboards:
+        assert len(dashboard["Matches"]) == 13
+        assert all(m["value"] == "ldi_readings" for m in dashboard["Matches"])
+
+
+def test_find_sql(ldi_resources, capsys):
+    # Only provision specific dashboard(s).
+    ldi_resources(
+        dashboards=[
+            "tests/grafana/dashboards/ldi-v27.json",
+            "tests/grafana/dashboards/ldi-v33.json",
+        ]
+    )
+
+    # Run command and capture output.
+    set_command(
+        "find ldi_readings --sql='SELECT uid, COUNT(*) AS matches FROM matches "
+        "GROUP BY uid ORDER BY uid'"
+    )
+    grafana_wtf.commands.run()
+    captured = capsys.readouterr()
+
+    # Verify output.
+    data = json.loads(captured.out)
+    assert data == [
+        {"uid": "ioUrPwQiz", "matches": 13},
+        {"uid": "jpVsQxRja", "matches": 13},
+    ]
+
+
 def test_replace_dashboard_success(ldi_resources, capsys):
     # Only provision specific dashboard(s).
     ldi_resources(
@@ -1,10 +1,13 @@
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, PropertyMock, patch
 
 import pytest
-from munch import Munch
+from grafana_client.client import GrafanaClientError
+from munch import Munch, munchify
 
+from grafana_wtf.cache import DocumentCache
 from grafana_wtf.core import GrafanaEngine, GrafanaWtf, Indexer
-from grafana_wtf.model import GrafanaDataModel
+from grafana_wtf.journal import ReplaceJournal
+from grafana_wtf.model import DashboardDetails, DatasourceItem, GrafanaDataModel, ReplaceOutcome
 
 
 def test_collect_datasource_items_variable_all():
@@ -39,6 +42,174 @@ def test_collect_datasource_items_variable_all():
     assert result == []
 
 
+def test_indexer_deduplicates_datasource_items():
+    """
+    Verify deduplication of data source references, retaining their order.
+    """
+    panels = [
+        {"id": 1, "datasource": {"uid": "foo", "type": "influxdb"}},
+        {"id": 2, "datasource": Munch({"type": "influxdb", "uid": "foo"})},
+        {"id": 3, "datasource": "bar"},
+        {"id": 4, "datasource": "bar"},
+        {"id": 5, "datasource": {"uid": "baz"}},
+    ]
+    dashboard = munchify(
+        {"meta": {"isFolder": False}, "dashboard": {"uid": "dash", "panels": panels}}
+    )
+    engine_mock = Mock(
+        scan_datasources=Mock(return_value=[]),
+        scan_dashboards=Mock(return_value=[dashboard]),
+        dashboard_details=Mock(return_value=[DashboardDetails(dashboard=dashboard)]),
+    )
+    indexer = Indexer(engine=engine_mock)
+    assert indexer.dashboard_datasource_index["dash"] == [
+        DatasourceItem(uid="foo", type="influxdb"),
+        DatasourceItem(name="bar"),
+        DatasourceItem(uid="baz"),
+    ]
+
+
+def test_indexer_persistent_index(tmp_path):
+    """
+    Verify the dashboard to data source index is only rebuilt for changed dashboards.
+    """
+
+    def make_dashboard(uid, version, datasource):
+        return munchify(
+            {
+                "meta": {"isFolder": False},
+                "dashboard": {
+                    "uid": uid,
+                    "version": version,
+                    "panels": [{"id": 1, "datasource": {"uid": datasource}}],
+                },
+            }
+        )
+
+    def make_indexer(dashboards):
+        engine_mock = Mock(
+            scan_datasources=Mock(return_value=[]),
+            scan_dashboards=Mock(return_value=dashboards),
+            dashboard_details=Mock(
+                return_value=[DashboardDetails(dashboard=dashboard) for dashboard in dashboards]
+            ),
+        )
+        return Indexer(engine=engine_mock, store=store)
+
+    store = DocumentCache(path=tmp_path, namespace="http://localhost:3000")
+    make_indexer([make_dashboard("foo", 1, "ds1"), make_dashboard("bar", 1, "ds1")])
+
+    # Unchanged dashboards are not inspected again, changed ones are.
+    with patch.object(
+        Indexer, "collect_dashboard_datasource_items", autospec=True, return_value=[]
+    ) as collect:
+        indexer = make_indexer([make_dashboard("foo", 1, "ds1"), make_dashboard("bar", 2, "ds2")])
+    assert collect.call_count == 1
+    assert indexer.dashboard_datasource_index == {"foo": [DatasourceItem(uid="ds1")], "bar": []}
+    assert indexer.datasource_dashboard_index == {"ds1": ["foo"]}
+
+    # Indexing a subset of dashboards retains the entries of the others.
+    indexer = Indexer(
+        engine=Mock(scan_datasources=Mock(return_value=[])), store=store, dashboards=False
+    )
+    indexer.index_dashboard(DashboardDetails(dashboard=make_dashboard("baz", 1, "ds3")))
+    indexer.save_index()
+    state = store.get("index", "dashboard-datasources")
+    assert sorted(state["dashboards"]) == ["bar", "baz", "foo"]
+
+    # Indexing all dashboards drops the entries of dashboards which no longer exist.
+    make_indexer([make_dashboard("foo", 1, "ds1")])
+    state = store.get("index", "dashboard-datasources")
+    assert sorted(state["dashboards"]) == ["foo"]
+
+
+def test_indexer_listing(tmp_path):
+    """
+    Verify only changed dashboards are fetched when indexing based on the listing.
+    """
+    versions = {"foo": 1, "bar": 1}
+
+    def make_dashboard(uid):
+        return munchify(
+            {
+                "meta": {"isFolder": False, "url": f"/d/{uid}"},
+                "dashboard": {
+                    "uid": uid,
+                    "title": uid.title(),
+                    "version": versions[uid],
+                    "panels": [{"id": 1, "datasource": {"uid": f"ds-{uid}-{versions[uid]}"}}],
+                },
+            }
+        )
+
+    engine = GrafanaWtf("http://localhost:3000")
+    engine.grafana = Mock()
+    engine.grafana.datasource.list_datasources = Mock(return_value=[])
+    engine.grafana.search.search_dashboards = Mock(
+        return_value=[{"uid": uid, "title": uid.title(), "url": f"/d/{uid}"} for uid in versions]
+        + [{"uid": "folder", "title": "Folder", "type": "dash-folder"}]
+    )
+    engine.grafana.dashboard.get_dashboard = Mock(side_effect=make_dashboard)
+    engine.get_dashboard_versions = Mock(
+        side_effect=lambda dashboard_uid, **kwargs: [{"version": versions[dashboard_uid]}]
+    )
+    engine.indexes = DocumentCache(path=tmp_path, namespace="http://localhost:3000")
+    engine.progressbar = False
+
+    Indexer(engine=engine, store=engine.indexes, listing=True)
+    assert engine.grafana.dashboard.get_dashboard.call_count == 2
+    engine.get_dashboard_versions.assert_not_called()
+
+    # Only the changed dashboard is fetched again.
+    versions["bar"] = 2
+    engine.grafana.dashboard.get_dashboard.reset_mock()
+    indexer = Indexer(engine=engine, store=engine.indexes, listing=True)
+    engine.grafana.dashboard.get_dashboard.assert_called_once_with("bar")
+    assert indexer.dashboard_datasource_index == {
+        "bar": [DatasourceItem(uid="ds-bar-2")],
+        "foo": [DatasourceItem(uid="ds-foo-1")],
+    }
+    assert indexer.dashboard_by_uid["foo"].dashboard.title == "Foo"
+    assert indexer.dashboard_by_uid["foo"].meta.url == "/d/foo"
+
+
+@patch.object(GrafanaWtf, "version", new_callable=PropertyMock, return_value="11.0.0")
+def test_indexer_listing_after_replace(version, tmp_path):
+    """
+    Verify modified dashboards are inspected again, even when their version probe is stale.
+    """
+    state = {
+        "meta": {"isFolder": False, "url": "/d/foo"},
+        "dashboard": {"uid": "foo", "version": 1, "panels": [{"datasource": {"uid": "ds1"}}]},
+    }
+
+    def update_dashboard(dashboard):
+        state["dashboard"] = dict(dashboard["dashboard"], version=2)
+        return {"version": 2}
+
+    engine = GrafanaWtf("http://localhost:3000")
+    engine.grafana = Mock()
+    engine.grafana.datasource.list_datasources = Mock(return_value=[])
+    engine.grafana.search.search_dashboards = Mock(
+        return_value=[{"uid": "foo", "title": "Foo", "url": "/d/foo"}]
+    )
+    engine.grafana.dashboard.get_dashboard = Mock(side_effect=lambda uid: munchify(state))
+    engine.grafana.dashboard.update_dashboard = Mock(side_effect=update_dashboard)
+    # Like a response served from the HTTP cache, the version probe does not see the update.
+    engine.get_dashboard_versions = Mock(return_value=[{"version": 1}])
+    engine.indexes = DocumentCache(path=tmp_path, namespace="http://localhost:3000")
+    engine.progressbar = False
+
+    def explore():
+        indexer = Indexer(engine=engine, store=engine.indexes, listing=True)
+        return indexer.datasource_dashboard_index
+
+    assert explore() == {"ds1": ["foo"]}
+    assert explore() == {"ds1": ["foo"]}
+    engine.replace("ds1", "ds2", dashboards=[munchify(state)])
+    assert explore() == {"ds2": ["foo"]}
+
+
 def test_connect_success():
     wtf = GrafanaWtf("https://play.grafana.org")
     build_info = wtf.build_info
@@ -145,3 +316,391 @@ class TestScanDashboardsPagination:
         # Should call search twice (second call discovers no more results)
         assert engine.grafana.search.search_dashboards.call_count == 2
         assert len(engine.data.dashboard_list) == 5000
+
+
+class TestReplaceCacheInvalidation:
+    """Tests for fine-grained cache handling in replace."""
+
+    def _create_engine(self, dashboards, fresh_dashboards):
+        engine = GrafanaWtf("http://localhost:3000")
+        engine.grafana = Mock()
+        engine.grafana.client.url = "http://localhost:3000/api"
+        engine.grafana.dashboard.get_dashboard = Mock(side_effect=lambda uid: fresh_dashboards[uid])
+        engine.documents = Mock(get=Mock(return_value=None))
+        engine.data = GrafanaDataModel(dashboards=munchify(dashboards))
+        return engine
+
+    def test_replace_uses_fresh_read_and_evicts_modified_only(self):
+        cached = [
+            {"dashboard": {"uid": "foo", "title": "ldi_v2"}, "meta": {}},
+            {"dashboard": {"uid": "bar", "title": "other"}, "meta": {}},
+        ]
+        fresh = {"foo": {"dashboard": {"uid": "foo", "title": "ldi_v2 fresh"}, "meta": {}}}
+        engine = self._create_engine(cached, fresh)
+
+        engine.replace("ldi_v2", "ldi_v3")
+
+        # Only the matching dashboard is fetched again, using a fresh read.
+        engine.grafana.dashboard.get_dashboard.assert_called_once_with("foo")
+        update = engine.grafana.dashboard.update_dashboard
+        update.assert_called_once()
+        assert update.call_args.kwargs["dashboard"]["dashboard"]["title"] == "ldi_v3 fresh"
+
+        # Only the modified dashboard is evicted from the caches.
+        engine.grafana.client.s.cache.delete.assert_called_with(
+            urls=[
+                "http://localhost:3000/api/dashboards/uid/foo",
+                "http://localhost:3000/api/dashboards/uid/foo/versions",
+                "http://localhost:3000/api/dashboards/uid/foo/versions?limit=1",
+            ]
+        )
+        assert {call.args for call in engine.documents.delete.call_args_list} == {
+            ("dashboard", "foo"),
+            ("dashboard-compact", "foo"),
+            ("dashboard-text", "foo"),
+            ("graph", "dependencies"),
+        }
+        engine.documents.clear.assert_not_called()
+
+    def test_replace_dry_run_does_not_touch_caches(self):
+        cached = [{"dashboard": {"uid": "foo", "title": "ldi_v2"}, "meta": {}}]
+        engine = self._create_engine(cached, {})
+
+        outcomes = engine.replace("ldi_v2", "ldi_v3", dry_run=True)
+
+        assert [outcome.status for outcome in outcomes] == ["dry-run"]
+        engine.grafana.dashboard.get_dashboard.assert_not_called()
+        engine.grafana.dashboard.update_dashboard.assert_not_called()
+        engine.documents.delete.assert_not_called()
+
+
+class TestReplaceOptimisticLocking:
+    """Tests for version-safe and concurrent replace."""
+
+    def _create_engine(self, count=1, concurrency=0):
+        dashboards = [
+            {"dashboard": {"uid": f"dash-{i}", "title": "ldi_v2", "version": 1}, "meta": {}}
+            for i in range(count)
+        ]
+        engine = GrafanaWtf("http://localhost:3000")
+        engine.grafana = Mock()
+        engine.grafana.client.url = "http://localhost:3000/api"
+        engine.data = GrafanaDataModel(dashboards=munchify(dashboards))
+        engine.enable_concurrency(concurrency)
+        return engine
+
+    @staticmethod
+    def _dashboard(uid, version):
+        return {"dashboard": {"uid": uid, "title": "ldi_v2", "version": version}, "meta": {}}
+
+    def test_replace_sends_expected_version(self):
+        engine = self._create_engine()
+        engine.grafana.dashboard.get_dashboard = Mock(return_value=self._dashboard("dash-0", 5))
+        engine.grafana.dashboard.update_dashboard = Mock(return_value={"version": 6})
+
+        outcomes = engine.replace("ldi_v2", "ldi_v3")
+
+        payload = engine.grafana.dashboard.update_dashboard.call_args.kwargs["dashboard"]
+        assert payload["dashboard"]["version"] == 5
+        assert payload["overwrite"] is False
+        assert [(o.uid, o.status, o.version_before, o.version_after) for o in outcomes] == [
+            ("dash-0", "updated", 5, 6)
+        ]
+
+    def test_replace_retries_on_conflict(self):
+        engine = self._create_engine()
+        engine.grafana.dashboard.get_dashboard = Mock(
+            side_effect=[self._dashboard("dash-0", 5), self._dashboard("dash-0", 6)]
+        )
+        conflict = GrafanaClientError(412, {"status": "version-mismatch"}, "Client Error 412")
+        engine.grafana.dashboard.update_dashboard = Mock(side_effect=[conflict, {"version": 7}])
+
+        outcomes = engine.replace("ldi_v2", "ldi_v3")
+
+        assert engine.grafana.dashboard.get_dashboard.call_count == 2
+        payload = engine.grafana.dashboard.update_dashboard.call_args.kwargs["dashboard"]
+        assert payload["dashboard"]["version"] == 6
+        assert (outcomes[0].status, outcomes[0].attempts, outcomes[0].version_after) == (
+            "updated",
+            2,
+            7,
+        )
+
+    def test_replace_gives_up_on_persistent_conflict(self):
+        engine = self._create_engine()
+        engine.grafana.dashboard.get_dashboard = Mock(return_value=self._dashboard("dash-0", 5))
+        conflict = GrafanaClientError(412, {"status": "version-mismatch"}, "Client Error 412")
+        engine.grafana.dashboard.update_dashboard = Mock(side_effect=conflict)
+
+        outcomes = engine.replace("ldi_v2", "ldi_v3")
+
+        assert (outcomes[0].status, outcomes[0].attempts) == ("conflict", engine.replace_attempts)
+
+    def test_replace_concurrent(self):
+        engine = self._create_engine(count=20, concurrency=4)
+        engine.grafana.dashboard.get_dashboard = Mock(
+            side_effect=lambda uid: self._dashboard(uid, 1)
+        )
+        engine.grafana.dashboard.update_dashboard = Mock(return_value={"version": 2})
+
+        outcomes = engine.replace("ldi_v2", "ldi_v3")
+
+        assert engine.grafana.dashboard.update_dashboard.call_count == 20
+        assert [outcome.uid for outcome in outcomes] == [f"dash-{i}" for i in range(20)]
+        assert all(outcome.status == "updated" for outcome in outcomes)
+
+
+@patch.object(GrafanaWtf, "version", new_callable=PropertyMock, return_value="11.0.0")
+def test_rollback_ignores_dry_run(version, tmp_path):
+    journal = ReplaceJournal(tmp_path / "journal.jsonl")
+    context = dict(expression="ldi_v2", replacement="ldi_v3")
+    updated = dict(status="updated", version_before=1, version_after=2)
+    journal.record(ReplaceOutcome(uid="foo", **updated), **context)
+    journal.record(ReplaceOutcome(uid="foo", status="dry-run", version_before=2), **context)
+    journal.record(ReplaceOutcome(uid="bar", **updated), **context)
+    journal.record(ReplaceOutcome(uid="bar", status="restored", version_before=2, version_after=3))
+    journal.record(ReplaceOutcome(uid="bar", status="dry-run", version_before=3), **context)
+
+    engine = GrafanaWtf("http://localhost:3000")
+    engine.grafana = Mock()
+    engine.grafana.dashboard.get_dashboard = Mock(
+        side_effect=lambda uid: {"dashboard": {"uid": uid, "version": 2}, "meta": {}}
+    )
+    engine.grafana.dashboard.client.POST = Mock(return_value={"version": 3})
+
+    outcomes = engine.rollback(journal)
+
+    # The dry run does not hide the version to restore, and restored dashboards are skipped.
+    assert [(o.uid, o.status, o.version_after) for o in outcomes] == [("foo", "restored", 3)]
+    engine.grafana.dashboard.client.POST.assert_called_once_with(
+        "/dashboards/uid/foo/restore", json={"version": 1}
+    )
+
+
+@patch.object(GrafanaWtf, "version", new_callable=PropertyMock, return_value="11.0.0")
+def test_replace_resume_after_rollback(version, tmp_path):
+    state = {"dashboard": {"uid": "foo", "title": "ldi_v2", "version": 1}, "meta": {}}
+
+    def update_dashboard(dashboard):
+        version = state["dashboard"]["version"] + 1
+        state["dashboard"] = dict(dashboard["dashboard"], version=version)
+        return {"version": version}
+
+    def restore_dashboard(path, json):
+        return update_dashboard({"dashboard": dict(state["dashboard"], title="ldi_v2")})
+
+    engine = GrafanaWtf("http://localhost:3000")
+    engine.grafana = Mock()
+    engine.grafana.dashboard.get_dashboard = Mock(side_effect=lambda uid: munchify(state))
+    engine.grafana.dashboard.update_dashboard = Mock(side_effect=update_dashboard)
+    engine.grafana.dashboard.client.POST = Mock(side_effect=restore_dashboard)
+    journal = ReplaceJournal(tmp_path / "journal.jsonl")
+
+    def replace(resume=False):
+        dashboards = [munchify(state)]
+        outcomes = engine.replace(
+            "ldi_v2", "ldi_v3", journal=journal, resume=resume, dashboards=dashboards
+        )
+        return [(o.uid, o.status) for o in outcomes]
+
+    assert replace() == [("foo", "updated")]
+    assert [(o.uid, o.status) for o in engine.rollback(journal)] == [("foo", "restored")]
+    assert state["dashboard"]["title"] == "ldi_v2"
+
+    # The rolled back dashboard is not skipped when resuming.
+    assert replace(resume=True) == [("foo", "updated")]
+    assert state["dashboard"]["title"] == "ldi_v3"
+    assert replace(resume=True) == []
+
+
+class TestLowMemory:
+    """Tests for processing dashboards one by one, see `enable_low_memory`."""
+
+    def _create_engine(self, concurrency=0):
+        responses = {
+            uid: {"dashboard": {"uid": uid, "title": title, "version": 1}, "meta": {}}
+            for uid, title in [("foo", "ldi_v2"), ("bar", "other"), ("baz", "ldi_v2 too")]
+        }
+        engine = GrafanaWtf("http://localhost:3000")
+        engine.grafana = Mock()
+        engine.grafana.search.search_dashboards = Mock(
+            return_value=[{"uid": uid, "title": uid} for uid in responses]
+            + [{"uid": "folder", "title": "folder", "type": "dash-folder"}]
+        )
+        engine.grafana.dashboard.get_dashboard = Mock(side_effect=lambda uid: responses[uid])
+        engine.enable_concurrency(concurrency)
+        engine.enable_low_memory()
+        return engine
+
+    @pytest.mark.parametrize("concurrency", [0, 2])
+    def test_search_streaming(self, concurrency):
+        engine = self._create_engine(concurrency=concurrency)
+        result = engine.search("ldi_v2", dashboards=engine.iter_dashboards())
+
+        # Only matching dashboards are retained, in stable sort order.
+        assert [item.data.dashboard.uid for item in result.dashboards] == ["baz", "foo"]
+        assert engine.data.dashboards == []
+        assert engine.data.dashboard_texts == {}
+        assert engine.grafana.dashboard.get_dashboard.call_count == 3
+
+    def test_iter_search(self):
+        engine = self._create_engine()
+        items = engine.iter_search("ldi_v2", dashboards=engine.iter_dashboards())
+
+        # Matching dashboards are generated one by one, in order of processing.
+        assert next(items)[1].data.dashboard.uid == "foo"
+        assert engine.grafana.dashboard.get_dashboard.call_count == 1
+        assert [(kind, item.data.dashboard.uid) for kind, item in items] == [("dashboards", "baz")]
+
+    @pytest.mark.parametrize("concurrency", [0, 2])
+    def test_replace_single_pass(self, concurrency):
+        engine = self._create_engine(concurrency=concurrency)
+        outcomes = engine.replace(
+            "ldi_v2", "ldi_v3", dry_run=True, dashboards=engine.iter_dashboards()
+        )
+
+        # Dashboards are listed and fetched only once, and are not retained.
+        assert [(o.uid, o.status) for o in outcomes] == [("foo", "dry-run"), ("baz", "dry-run")]
+        assert engine.grafana.search.search_dashboards.call_count == 1
+        assert engine.grafana.dashboard.get_dashboard.call_count == 3
+        assert engine.data.dashboards == []
+
+
+class TestDashboardHistory:
+    """Tests for the incremental history store used by `log`."""
+
+    @staticmethod
+    def make_dashboard(version):
+        return munchify({"dashboard": {"id": 1, "uid": "foo", "version": version}, "meta": {}})
+
+    @staticmethod
+    def make_versions(version):
+        return [
+            dict(version=number, created=f"2024-01-{number:02d}", createdBy="admin", message="")
+            for number in range(version, 0, -1)
+        ]
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        engine = GrafanaWtf("http://localhost:3000")
+        engine.grafana = Mock()
+        engine.indexes = DocumentCache(path=tmp_path, namespace="http://localhost:3000")
+        with patch.object(GrafanaWtf, "version", new="11.0.0"):
+            yield engine
+
+    def respond(self, engine, version):
+        # Respond with pages of two versions each, newest first.
+        versions = self.make_versions(version)
+        pages = [versions[index : index + 2] for index in range(0, len(versions), 2)]
+        engine.grafana.dashboard.client.GET = Mock(
+            side_effect=[
+                {"versions": page, "continueToken": "next" if index < len(pages) - 1 else ""}
+                for index, page in enumerate(pages)
+            ]
+        )
+        return engine.grafana.dashboard.client.GET
+
+    def test_history_full(self, engine):
+        get = self.respond(engine, 5)
+        assert engine.dashboard_history(self.make_dashboard(5)) == self.make_versions(5)
+        assert get.call_count == 3
+
+    def test_history_unchanged(self, engine):
+        self.respond(engine, 5)
+        engine.dashboard_history(self.make_dashboard(5))
+        get = self.respond(engine, 5)
+        assert engine.dashboard_history(self.make_dashboard(5)) == self.make_versions(5)
+        assert get.call_count == 0
+
+    def test_history_incremental(self, engine):
+        self.respond(engine, 5)
+        engine.dashboard_history(self.make_dashboard(5))
+
+        # Paging stops when reaching a known version.
+        get = self.respond(engine, 8)
+        assert engine.dashboard_history(self.make_dashboard(8)) == self.make_versions(8)
+        assert get.call_count == 2
+
+    def test_history_recreated(self, engine):
+        self.respond(engine, 5)
+        engine.dashboard_history(self.make_dashboard(5))
+        get = self.respond(engine, 2)
+        assert engine.dashboard_history(self.make_dashboard(2)) == self.make_versions(2)
+        assert get.call_count == 1
+
+    def test_history_without_version(self, engine):
+        self.respond(engine, 5)
+        engine.dashboard_history(self.make_dashboard(5))
+
+        # Without knowing the dashboard version, the first page is always requested.
+        get = self.respond(engine, 5)
+        assert engine.dashboard_history(self.make_dashboard(None)) == self.make_versions(5)
+        assert get.call_count == 1
+
+        # Re-created dashboards are detected by their versions.
+        get = self.respond(engine, 3)
+        assert engine.dashboard_history(self.make_dashboard(None)) == self.make_versions(3)
+        assert get.call_count == 2
+
+    def test_log_from_listing(self, engine):
+        engine.grafana.search.search_dashboards = Mock(
+            return_value=[
+                {"uid": "foo", "id": 1, "title": "Foo", "url": "/d/foo/foo", "type": "dash-db"},
+                {"uid": "folder", "title": "Folder", "url": "/f/folder", "type": "dash-folder"},
+            ]
+        )
+        self.respond(engine, 1)
+        entries = engine.log()
+
+        # Full dashboards are not fetched.
+        engine.grafana.dashboard.get_dashboard.assert_not_called()
+        assert [(entry["uid"], entry["version"], entry["folder"]) for entry in entries] == [
+            ("foo", 1, "General")
+        ]
+
+
+def test_log_recent():
+    """
+    Verify `log_recent` returns the same entries like sorting the whole edit history,
+    without acquiring the history of dashboards which can not contribute.
+    """
+    histories = {
+        "foo": [
+            {"version": 2, "created": "2024-03-01T00:00:00Z"},
+            {"version": 1, "created": "2024-01-01T00:00:00Z"},
+        ],
+        "bar": [
+            {"version": 2, "created": "2024-03-01T00:00:00Z"},
+            {"version": 1, "created": "2024-02-01T00:00:00Z"},
+        ],
+        "baz": [{"version": 1, "created": "2023-01-01T00:00:00Z"}],
+    }
+    dashboards = [
+        munchify(
+            {
+                "dashboard": {"id": 1, "uid": uid, "title": uid, "version": len(history)},
+                "meta": {"url": f"/d/{uid}", "updated": history[0]["created"]},
+            }
+        )
+        for uid, history in sorted(histories.items())
+    ]
+    engine = GrafanaWtf("http://localhost:3000")
+
+    def dashboard_history(dashboard):
+        return [
+            dict(item, createdBy="admin", message="") for item in histories[dashboard.dashboard.uid]
+        ]
+
+    history = Mock(side_effect=dashboard_history)
+
+    with patch.object(engine, "dashboard_history", history):
+        everything = sorted(
+            (entry for dashboard in dashboards for entry in engine.log_entries(dashboard)),
+            key=lambda entry: entry["datetime"],
+        )
+        history.reset_mock()
+        for limit in [1, 2, 3]:
+            assert engine.log_recent(dashboards, limit) == everything[-limit:]
+
+    # The history of the oldest dashboard has never been acquired.
+    assert {call.args[0].dashboard.uid for call in history.call_args_list} == {"foo", "bar"}
@@ -0,0 +1,100 @@
+from munch import munchify
+
+from grafana_wtf.graph import DependencyGraph
+from grafana_wtf.model import GrafanaDataModel
+
+
+def make_data():
+    dashboard = {
+        "meta": {"isFolder": False, "folderUid": "folder1", "url": "/d/dash1/foo"},
+        "dashboard": {
+            "uid": "dash1",
+            "title": "Foo",
+            "templating": {
+                "list": [
+                    {"name": "ds", "type": "datasource", "current": {"value": "influx"}},
+                    {"name": "host", "type": "query", "datasource": {"uid": "prom1"}},
+                ]
+            },
+            "panels": [
+                {"id": 1, "title": "Direct", "datasource": {"uid": "prom1"}},
+                {"id": 2, "title": "Variable", "datasource": "${ds}"},
+                {
+                    "id": 3,
+                    "type": "row",
+                    "panels": [{"id": 4, "title": "Library", "libraryPanel": {"uid": "lib1"}}],
+                },
+                {"id": 5, "title": "Missing", "datasource": "unknown"},
+            ],
+        },
+    }
+    return GrafanaDataModel(
+        dashboards=[munchify(dashboard)],
+        datasources=munchify(
+            [
+                {"uid": "prom1", "name": "prometheus", "type": "prometheus"},
+                {"uid": "influx1", "name": "influx", "type": "influxdb"},
+            ]
+        ),
+        folders=[{"id": 1, "uid": "folder1", "title": "Folder"}],
+        library_panels=[
+            {"uid": "lib1", "name": "Library", "model": {"datasource": {"uid": "influx1"}}}
+        ],
+        alert_rules=[
+            {
+                "uid": "rule1",
+                "title": "Rule",
+                "folderUID": "folder1",
+                "data": [{"datasourceUid": "prom1"}, {"datasourceUid": "__expr__"}],
+                "annotations": {"__dashboardUid__": "dash1", "__panelId__": "1"},
+            }
+        ],
+    )
+
+
+def test_graph_forward():
+    graph = DependencyGraph.from_data(make_data())
+    results = {item["node"]: item for item in graph.traverse("dashboard:dash1")}
+    assert results["folder:folder1"]["relation"] == "folder"
+    assert results["panel:dash1/4"]["depth"] == 1
+    assert results["library-panel:lib1"]["via"] == "panel:dash1/4"
+    assert results["variable:dash1/ds"]["relation"] == "variable"
+    assert results["datasource:influx1"]["depth"] == 2
+    assert results["datasource:unknown"]["missing"] is True
+    assert "alert-rule:rule1" not in results
+
+
+def test_graph_reverse():
+    graph = DependencyGraph.from_data(make_data())
+    nodes = [item["node"] for item in graph.traverse("datasource:prom1", reverse=True)]
+    assert nodes == [
+        "alert-rule:rule1",
+        "panel:dash1/1",
+        "variable:dash1/host",
+        "dashboard:dash1",
+    ]
+
+    nodes = [item["node"] for item in graph.traverse("datasource:influx1", reverse=True)]
+    assert nodes == [
+        "library-panel:lib1",
+        "variable:dash1/ds",
+        "panel:dash1/4",
+        "dashboard:dash1",
+        "panel:dash1/2",
+    ]
+
+
+def test_graph_resolve_and_summary():
+    graph = DependencyGraph.from_data(make_data())
+    assert graph.resolve("datasource:prometheus") == "datasource:prom1"
+    assert graph.resolve("dashboard:Foo") == "dashboard:dash1"
+    assert graph.resolve("dashboard:bar") is None
+    assert graph.summary()["nodes"] == {
+        "alert-rule": 1,
+        "dashboard": 1,
+        "datasource": 3,
+        "folder": 1,
+        "library-panel": 1,
+        "panel": 5,
+        "variable": 2,
+    }
@@ -0,0 +1,67 @@
+from grafana_wtf.journal import ReplaceJournal
+from grafana_wtf.model import ReplaceOutcome
+
+
+def test_journal_record_and_read(tmp_path):
+    journal = ReplaceJournal(tmp_path / "journal.jsonl")
+    assert journal.read() == []
+
+    outcome = ReplaceOutcome(uid="foo", status="updated", version_before=1, version_after=2)
+    journal.record(outcome, expression="ldi_v2", replacement="ldi_v3")
+
+    entries = journal.read()
+    assert len(entries) == 1
+    assert entries[0]["uid"] == "foo"
+    assert entries[0]["version_before"] == 1
+    assert entries[0]["expression"] == "ldi_v2"
+    assert "timestamp" in entries[0]
+
+
+def test_journal_completed(tmp_path):
+    journal = ReplaceJournal(tmp_path / "journal.jsonl")
+    context = dict(expression="ldi_v2", replacement="ldi_v3")
+    journal.record(ReplaceOutcome(uid="foo", status="updated"), **context)
+    journal.record(ReplaceOutcome(uid="bar", status="unchanged"), **context)
+    journal.record(ReplaceOutcome(uid="baz", status="conflict"), **context)
+    journal.record(ReplaceOutcome(uid="qux", status="failed"), **context)
+    journal.record(ReplaceOutcome(uid="qux", status="updated"), **context)
+    journal.record(
+        ReplaceOutcome(uid="other", status="updated"), expression="foo", replacement="bar"
+    )
+
+    assert journal.completed(**context) == {"foo", "bar", "qux"}
+    assert journal.completed() == {"foo", "bar", "qux", "other"}
+
+
+def test_journal_completed_rollback(tmp_path):
+    journal = ReplaceJournal(tmp_path / "journal.jsonl")
+    context = dict(expression="ldi_v2", replacement="ldi_v3")
+    journal.record(ReplaceOutcome(uid="foo", status="updated"), **context)
+    journal.record(ReplaceOutcome(uid="bar", status="updated"), **context)
+    journal.record(ReplaceOutcome(uid="baz", status="updated"), **context)
+    journal.record(ReplaceOutcome(uid="foo", status="restored"), action="rollback")
+    journal.record(ReplaceOutcome(uid="bar", status="skipped"), action="rollback")
+    journal.record(ReplaceOutcome(uid="baz", status="restored"), action="rollback")
+    journal.record(ReplaceOutcome(uid="baz", status="updated"), **context)
+
+    # Restored dashboards need to be processed again.
+    assert journal.completed(**context) == {"bar", "baz"}
+
+
+def test_journal_encoding(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = ReplaceJournal(path)
+    journal.record(ReplaceOutcome(uid="foo", title="Grüße", status="updated"), replacement="€")
+
+    assert "Grüße" in path.read_text(encoding="utf-8")
+    assert journal.read()[0]["replacement"] == "€"
+
+
+def test_journal_truncated_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = ReplaceJournal(path)
+    journal.record(ReplaceOutcome(uid="foo", status="updated"))
+    with open(path, "a") as f:
+        f.write('{"uid": "bar", "sta')
+
+    assert [entry["uid"] for entry in journal.read()] == ["foo"]
@@ -1,9 +1,20 @@
+import pickle
 import re
 
 import pytest
 from munch import Munch
 
-from grafana_wtf.model import DatasourceItem
+from grafana_wtf.model import (
+    CompactDashboard,
+    DashboardDataDetails,
+    DashboardDetails,
+    DatasourceItem,
+    LazyDocument,
+    collect_datasource_references,
+    dashboard_document,
+    dashboard_uid,
+)
+from grafana_wtf.util import to_json_text
 
 DATA = dict(uid="foo", name="bar", type="baz", url="qux")
 
@@ -55,3 +66,71 @@ def test_datasource_item_dict_compensate_datasource():
 
     # Check that the message matches.
     assert "The `datasource` attribute is ignored for the time being" in record[0].message.args[0]
+
+
+def test_datasource_item_hashable():
+    assert len({DatasourceItem(**DATA), DatasourceItem.from_payload(Munch(**DATA))}) == 1
+
+
+def test_collect_data_nodes_deduplicate():
+    nodes = [
+        {"id": 1, "datasource": "foo"},
+        {"id": 2, "datasource": "bar"},
+        Munch({"datasource": "foo", "id": 1}),
+        {"id": 3, "datasource": None},
+    ]
+    assert DashboardDataDetails.collect_data_nodes(nodes) == [
+        {"id": 1, "datasource": "foo"},
+        {"id": 2, "datasource": "bar"},
+    ]
+
+
+def test_collect_datasource_references():
+    dashboard = Munch(
+        meta=Munch(),
+        dashboard=Munch(
+            panels=[
+                Munch(datasource=Munch(uid="foo", type="influxdb")),
+                Munch(
+                    datasource="bar",
+                    targets=[Munch(datasource=Munch(type="influxdb", uid="foo"))],
+                ),
+                Munch(datasource=None, panels=[Munch(datasource="baz")]),
+            ],
+            templating=Munch(list=[Munch(datasource="bar")]),
+        ),
+    )
+    references = [{"uid": "foo", "type": "influxdb"}, "bar", "baz"]
+    assert collect_datasource_references(dashboard) == references
+    assert DashboardDetails(dashboard=dashboard).datasource_references == references
+
+
+def test_compact_dashboard():
+    response = {
+        "meta": {"isFolder": False, "url": "/d/foo/bar"},
+        "dashboard": {"uid": "foo", "title": "Bär", "version": 3, "panels": [{"id": 1}]},
+    }
+    dashboard = CompactDashboard.from_response(response)
+    assert dashboard.uid == "foo"
+    assert dashboard.version == 3
+    assert dashboard.meta.url == "/d/foo/bar"
+    assert dashboard["dashboard"].title == "Bär"
+    assert dashboard_uid(dashboard) == "foo"
+    assert dashboard_document(dashboard) == response
+    assert list(dashboard_document(dashboard)) == ["meta", "dashboard"]
+    assert dashboard.text == to_json_text(response, sort_keys=False)
+    assert DashboardDetails(dashboard=dashboard).panels == [{"id": 1}]
+    assert not hasattr(dashboard, "__dict__")
+
+
+def test_lazy_document():
+    data = {"uid": "foo", "panels": [{"id": 1, "targets": [{"refId": "A"}]}], "title": "Bär"}
+    document = LazyDocument.from_data(data)
+    assert document.members["panels"] == b'[{"id":1,"targets":[{"refId":"A"}]}]'
+    assert document.panels[0].targets[0].refId == "A"
+    assert document.get("version") is None
+    assert "version" not in document
+    assert list(document) == ["uid", "panels", "title"]
+    assert document.to_munch() == data
+    assert document.to_bytes().decode("utf-8") == to_json_text(data, sort_keys=False)
+    assert pickle.loads(pickle.dumps(document)) == data  # noqa: S301
@@ -0,0 +1,164 @@
+import io
+import json
+import sys
+from collections import OrderedDict
+from unittest.mock import Mock
+
+import pytest
+from munch import munchify
+
+from grafana_wtf.core import GrafanaWtf
+from grafana_wtf.model import GrafanaDataModel
+from grafana_wtf.report.columnar import (
+    TABLES,
+    dashboard_records,
+    datasource_records,
+    output_table,
+)
+from grafana_wtf.report.data import FLUSH_INTERVAL, output_records, output_results
+from grafana_wtf.report.tabular import TabularSearchReport
+from grafana_wtf.report.textual import TextualSearchReport
+from grafana_wtf.util import JsonPathFinder
+
+
+def test_output_records(capsys):
+    records = (OrderedDict(uid=uid, title="Grüße") for uid in ["foo", "bar"])
+    output_results("ndjson", records)
+    assert capsys.readouterr().out == (
+        '{"uid":"foo","title":"Grüße"}\n{"uid":"bar","title":"Grüße"}\n'
+    )
+
+
+def test_output_records_flush(monkeypatch):
+    stdout = io.StringIO()
+    stdout.flush = Mock()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    output_records({"id": index} for index in range(FLUSH_INTERVAL * 2 + 1))
+
+    # Output is flushed in batches, and once at the end.
+    assert len(stdout.getvalue().splitlines()) == FLUSH_INTERVAL * 2 + 1
+    assert stdout.flush.call_count == 3
+
+
+def test_output_records_mapping(capsys):
+    output_records({"grafana": {"version": "11.0.0"}})
+    assert json.loads(capsys.readouterr().out) == {"grafana": {"version": "11.0.0"}}
+
+
+EXPLORE_DASHBOARDS = [
+    {
+        "dashboard": {"uid": "foo", "title": "Foo", "path": "/d/foo", "url": "http://g/d/foo"},
+        "datasources": [{"uid": "ds1", "name": "ldi_v2", "type": "influxdb", "url": None}],
+        "datasources_missing": [{"uid": None, "name": "ldi_v1", "type": None}],
+    },
+    {
+        "dashboard": {"uid": "bar", "title": "Bar", "path": "/d/bar", "url": "http://g/d/bar"},
+        "datasources": [],
+    },
+]
+
+
+def test_dashboard_records():
+    records = list(dashboard_records(EXPLORE_DASHBOARDS))
+    assert [
+        (record["dashboard_uid"], record.get("datasource_name"), record.get("missing"))
+        for record in records
+    ] == [("foo", "ldi_v2", False), ("foo", "ldi_v1", True), ("bar", None, None)]
+
+
+def test_datasource_records():
+    results = {
+        "used": [
+            {
+                "datasource": {"uid": "ds1", "name": "ldi_v2", "type": "influxdb"},
+                "dashboards": [{"uid": "foo", "title": "Foo"}, {"uid": "bar", "title": "Bar"}],
+            }
+        ],
+        "unused": [{"datasource": {"uid": "ds2", "name": "weatherbase", "type": "influxdb"}}],
+    }
+    records = list(datasource_records(results))
+    assert [
+        (record["datasource_uid"], record["used"], record.get("dashboard_uid"))
+        for record in records
+    ] == [("ds1", True, "foo"), ("ds1", True, "bar"), ("ds2", False, None)]
+
+
+def test_output_table_parquet(tmp_path):
+    import duckdb
+
+    path = tmp_path / "dashboards.parquet"
+    output_table("parquet", path, "dashboards", dashboard_records(EXPLORE_DASHBOARDS))
+
+    connection = duckdb.connect()
+    relation = connection.read_parquet(str(path))
+    assert relation.columns == list(TABLES["dashboards"])
+    assert relation.types[-1] == "BOOLEAN"
+    assert relation.count("*").fetchone()[0] == 3
+
+
+def test_output_table_parquet_empty(tmp_path):
+    import duckdb
+
+    path = tmp_path / "versions.parquet"
+    output_table("parquet", path, "versions", [])
+
+    connection = duckdb.connect()
+    relation = connection.read_parquet(str(path))
+    assert relation.columns == list(TABLES["versions"])
+    assert relation.count("*").fetchone()[0] == 0
+
+
+def test_output_table_arrow(tmp_path):
+    ipc = pytest.importorskip("pyarrow.ipc")
+
+    path = tmp_path / "versions.arrow"
+    entries = [
+        {"version": 2, "datetime": "2024-01-02T00:00:00Z", "uid": "foo"},
+        {"version": 1, "datetime": "2024-01-01T00:00:00Z", "uid": "foo"},
+    ]
+    output_table("arrow", path, "versions", entries)
+
+    table = ipc.open_file(str(path)).read_all()
+    assert table.column_names == list(TABLES["versions"])
+    assert table.column("version").to_pylist() == [2, 1]
+
+
+def test_textual_get_panels():
+    dashboard = {
+        "title": "ldi_v2 overview",
+        "panels": [
+            {"id": 1, "type": "row", "panels": [{"id": 2, "datasource": "ldi_v2"}]},
+            {"id": 3, "datasource": "ldi_v2", "targets": [{"datasource": "ldi_v2"}]},
+        ],
+    }
+    matches = JsonPathFinder().find("ldi_v2", dashboard)
+    panels = TextualSearchReport.get_panels(matches)
+    assert sorted(str(match.full_path) for match in matches) == [
+        "panels.[0].panels.[0].datasource",
+        "panels.[1].datasource",
+        "panels.[1].targets.[0].datasource",
+        "title",
+    ]
+    assert len(panels) == len(matches)
+    panel_ids = {
+        str(match.full_path): panel and panel["id"]
+        for match, panel in zip(matches, panels)  # noqa: B905
+    }
+    assert panel_ids == {
+        "panels.[0].panels.[0].datasource": 2,
+        "panels.[1].datasource": 3,
+        "panels.[1].targets.[0].datasource": 3,
+        "title": None,
+    }
+
+
+def test_tabular_get_datasources():
+    dashboard = {"meta": {}, "dashboard": {"uid": "foo", "panels": [{"datasource": "ldi_v2"}]}}
+    engine = GrafanaWtf("http://localhost:3000")
+    engine.data = GrafanaDataModel(dashboards=[munchify(dashboard)])
+    [item] = engine.search("ldi_v2").dashboards
+
+    # The details of the dashboard are kept with the search result, and reused.
+    datasources = TabularSearchReport.get_datasources(item)
+    assert datasources == ["ldi_v2"]
+    assert TabularSearchReport.get_datasources(item) is datasources
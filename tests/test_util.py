@@ -0,0 +1,204 @@
+import io
+from collections import OrderedDict
+
+import pytest
+import yaml
+from jsonpath_rw import parse
+from munch import munchify
+
+from grafana_wtf.util import (
+    JsonPathFinder,
+    filter_with_sql,
+    json_escape,
+    json_text_searchable,
+    to_json_text,
+    yaml_dump,
+    yaml_ordered_dumper,
+)
+
+DASHBOARD = munchify(
+    {
+        "dashboard": {
+            "title": 'Quoted "title"',
+            "panels": [{"id": 1, "targets": [{"measurement": "ldi_readings"}]}],
+            "description": "Grüße",
+        }
+    }
+)
+
+
+def test_to_json_text_canonical():
+    assert to_json_text({"b": 1, "a": "ä"}) == '{"a":"ä","b":1}'
+
+
+def test_json_escape():
+    assert json_escape('foo "bar"') == 'foo \\"bar\\"'
+    assert json_escape("Grüße") == "Grüße"
+
+
+def test_finder_match():
+    matches = JsonPathFinder().find("ldi_readings", DASHBOARD)
+    assert [str(match.full_path) for match in matches] == [
+        "dashboard.panels.[0].targets.[0].measurement"
+    ]
+
+
+def test_finder_escaped_needle():
+    matches = JsonPathFinder().find('"title"', DASHBOARD)
+    assert [str(match.full_path) for match in matches] == ["dashboard.title"]
+
+    matches = JsonPathFinder().find("Grüße", DASHBOARD)
+    assert [str(match.full_path) for match in matches] == ["dashboard.description"]
+
+
+def test_finder_reuse_text():
+    """
+    The prefilter uses the precomputed text, so documents can be rejected without serializing.
+    """
+    finder = JsonPathFinder()
+    assert finder.find("ldi_readings", DASHBOARD, text="{}") == []
+    assert len(finder.find("ldi_readings", DASHBOARD, text=to_json_text(DASHBOARD))) == 1
+
+
+def test_finder_non_string_values():
+    """
+    Values which are represented differently in JSON text are still found.
+    """
+    document = munchify({"legend": True, "max": 1e-05, "paths": ["C:\\temp", "/var/lib"]})
+    finder = JsonPathFinder()
+    text = to_json_text(document)
+    assert [str(match.path) for match in finder.find("True", document, text=text)] == ["legend"]
+    assert [str(match.path) for match in finder.find("1e-05", document, text=text)] == ["max"]
+    assert [str(match.path) for match in finder.find("C:\\\\temp", document, text=text)] == [
+        "paths"
+    ]
+    assert [str(match.path) for match in finder.find("', '", document, text=text)] == ["paths"]
+
+
+def test_json_text_searchable():
+    assert json_text_searchable("ldi_readings")
+    assert json_text_searchable("grafana-worldmap-panel")
+    assert not json_text_searchable("True")
+    assert not json_text_searchable("1e+16")
+    assert not json_text_searchable('"title"')
+    assert not json_text_searchable("C:\\temp")
+    assert not json_text_searchable("Grüße")
+    assert not json_text_searchable("")
+
+
+def test_finder_replace_string_leaves_only():
+    document = munchify(
+        {
+            "dashboard": {
+                "ldi_v2": "key stays",
+                "version": 2,
+                "tags": ["ldi_v2", "other"],
+                "panels": [{"datasource": "ldi_v2", "title": 'Escaped "ldi_v2"'}],
+            }
+        }
+    )
+    text = to_json_text(document)
+    new, count = JsonPathFinder().replace("ldi_v2", "ldi_v3", document, text=text)
+    assert count == 3
+    assert new.dashboard["ldi_v2"] == "key stays"
+    assert new.dashboard.tags == ["ldi_v3", "other"]
+    assert new.dashboard.panels[0] == {"datasource": "ldi_v3", "title": 'Escaped "ldi_v3"'}
+
+    # Replace with numbers does not touch numeric values.
+    new, count = JsonPathFinder().replace("2", "3", document)
+    assert new.dashboard.version == 2
+
+    # The original document has not been modified.
+    assert to_json_text(document) == text
+
+
+def test_finder_replace_no_match_returns_same_object():
+    new, count = JsonPathFinder().replace("foobar", "baz", DASHBOARD, text="{}")
+    assert new is DASHBOARD
+    assert count == 0
+
+
+def test_finder_replace_scope():
+    document = munchify(
+        {
+            "dashboard": {
+                "title": "ldi_readings",
+                "panels": [
+                    {"title": "ldi_readings", "targets": [{"measurement": "ldi_readings"}]},
+                    {"panels": [{"targets": [{"measurement": "ldi_readings"}]}]},
+                ],
+            }
+        }
+    )
+    new, count = JsonPathFinder().replace(
+        "ldi_readings", "ldi_values", document, scope=parse("$..targets")
+    )
+    assert count == 2
+    assert new.dashboard.title == "ldi_readings"
+    assert new.dashboard.panels[0].title == "ldi_readings"
+    assert new.dashboard.panels[0].targets[0].measurement == "ldi_values"
+    assert new.dashboard.panels[1].panels[0].targets[0].measurement == "ldi_values"
+
+    # Nested subtrees matched by the scope are only processed once.
+    new, count = JsonPathFinder().replace("ldi", "ldi_x", document, scope=parse("$..panels"))
+    assert count == 3
+    assert new.dashboard.panels[1].panels[0].targets[0].measurement == "ldi_x_readings"
+
+
+def test_filter_with_sql():
+    data = [
+        {"uid": "foo", "version": 1, "id": None, "message": "it's", "tags": ["a"]},
+        {"uid": "foo", "version": 2, "id": 42, "message": None, "tags": []},
+        {"uid": "bar", "version": 1, "id": 43, "message": "", "tags": None},
+    ]
+    results = filter_with_sql(
+        data=data,
+        view_name="dashboard_versions",
+        expression="""
+            SELECT uid, MAX(version) AS version, MAX(id) AS id, FIRST(tags ORDER BY version) AS tags
+            FROM dashboard_versions
+            GROUP BY uid
+            ORDER BY uid
+        """,
+    )
+    assert results == [
+        {"uid": "bar", "version": 1, "id": 43, "tags": None},
+        {"uid": "foo", "version": 2, "id": 42, "tags": '["a"]'},
+    ]
+
+
+@pytest.mark.parametrize("Dumper", [None, yaml.SafeDumper])
+def test_yaml_dump(Dumper):
+    data = [OrderedDict(uid="foo", title="Grüße"), munchify({"b": 1, "a": [1, 2]}), []]
+    assert yaml_dump(data, Dumper=Dumper) == (
+        '- uid: foo\n  title: "Gr\\xFC\\xDFe"\n- a:\n  - 1\n  - 2\n  b: 1\n- []\n'
+    )
+    assert yaml_dump({"foo": data}, Dumper=Dumper) == yaml.dump(
+        {"foo": data}, Dumper=yaml_ordered_dumper(Dumper), default_flow_style=False
+    )
+
+
+@pytest.mark.parametrize("data", ["foo", 42, None, True, "", "multi\nline", "x" * 120])
+def test_yaml_dump_scalar(data):
+    assert yaml_dump(data) == yaml.dump(data, Dumper=yaml.SafeDumper)
+
+
+def test_yaml_dump_shared_objects():
+    shared = {"id": 1}
+
+    # Objects shared between items of lists are repeated.
+    assert yaml_dump([shared, shared]) == "- id: 1\n- id: 1\n"
+
+    # Within mappings, they are referenced by aliases.
+    assert yaml_dump({"a": shared, "b": shared}) == "a: &id001\n  id: 1\nb: *id001\n"
+
+
+def test_yaml_dump_stream_anchors():
+    panel = {"id": 1}
+    data = [{"panel": panel, "targets": [{"_panel": panel}]}, {"_panel": panel, "again": panel}]
+    stream = io.StringIO()
+    assert yaml_dump(data, stream=stream) is None
+    output = stream.getvalue()
+    assert output.count("&id001") == 1
+    assert output.count("&id002") == 1
+    assert yaml.safe_load(output) == data
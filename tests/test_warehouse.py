@@ -0,0 +1,65 @@
+from unittest.mock import Mock
+
+from munch import munchify
+
+from grafana_wtf.core import GrafanaWtf
+from grafana_wtf.model import GrafanaDataModel
+from grafana_wtf.warehouse import Warehouse
+
+
+def make_dashboard(uid, version):
+    return {
+        "meta": {"isFolder": False, "url": f"/d/{uid}", "folderTitle": "General"},
+        "dashboard": {
+            "uid": uid,
+            "id": 1,
+            "title": uid,
+            "version": version,
+            "panels": [{"id": 1, "datasource": {"uid": "prom1"}, "targets": [{"expr": "up"}]}],
+        },
+    }
+
+
+def make_engine(dashboards):
+    engine = GrafanaWtf("http://localhost:3000")
+    engine.data = GrafanaDataModel(
+        dashboards=munchify(dashboards),
+        datasources=munchify([{"uid": "prom1", "name": "prometheus", "type": "prometheus"}]),
+    )
+    engine.scan_catalog = Mock()
+    engine.scan_datasources = Mock(return_value=engine.data.datasources)
+    engine.dashboard_history = Mock(
+        side_effect=lambda dashboard: [
+            dict(version=number, created=f"2024-01-{number:02d}", createdBy="admin", message="")
+            for number in range(dashboard.dashboard.version, 0, -1)
+        ]
+    )
+    return engine
+
+
+def test_warehouse_sync(tmp_path):
+    path = tmp_path / "grafana.duckdb"
+
+    warehouse = Warehouse(path)
+    outcome = warehouse.sync(make_engine([make_dashboard("foo", 1), make_dashboard("bar", 2)]))
+    assert outcome["changed"] == 2
+    assert outcome["versions"] == 3
+
+    # Only changed and removed dashboards are updated, versions are appended.
+    engine = make_engine([make_dashboard("foo", 3)])
+    outcome = warehouse.sync(engine)
+    assert (outcome["changed"], outcome["removed"], outcome["versions"]) == (1, 1, 2)
+    warehouse.close()
+
+    warehouse = Warehouse(path, read_only=True)
+    assert warehouse.query("SELECT uid, version FROM dashboards") == [{"uid": "foo", "version": 3}]
+    assert warehouse.query("SELECT dashboard_uid, COUNT(*) AS count FROM targets GROUP BY ALL") == [
+        {"dashboard_uid": "foo", "count": 1}
+    ]
+    assert warehouse.query(
+        "SELECT uid, COUNT(*) AS count FROM dashboard_versions GROUP BY ALL ORDER BY uid"
+    ) == [{"uid": "bar", "count": 2}, {"uid": "foo", "count": 3}]
+    assert warehouse.query("SELECT datasource_name, missing FROM dashboard_datasources") == [
+        {"datasource_name": "prometheus", "missing": False}
+    ]
+    warehouse.close()